@@ -0,0 +1,182 @@
+"""
+Offline end-to-end benchmark of the speak path.
+
+Runs the CLI path (`_execute_tts_movement` with a real OpenAI client pointed at a local fake TTS
+server), the HTTP server path (`POST /tts` through the FastAPI app) and `SwayRollRT` in isolation,
+against a fake robot and a null audio sink. Reports time-to-first-audio, end-to-end latency,
+`set_target` cadence and jitter, motion overruns, CPU per hop and peak memory. The streaming path
+is also run once per TTS transfer format (`--formats`), reporting the bytes each one moved over the
+link; compressed formats need ffmpeg and are skipped without it.
+
+Run from the repository root:
+    python -m benchmarks.bench_e2e [--fast] [--ttfb 0.3] [--bandwidth 32000] [--set-target-ms 30] [--json results.json]
+"""
+import json
+import time
+import argparse
+import resource
+import statistics
+from typing import Any, Dict, List
+
+import numpy as np
+from openai import OpenAI
+
+from reachy_tts import core
+from reachy_tts.backends import OpenAIBackend, HTTPBackend, FormatSelector
+from reachy_tts.decode import ffmpeg_available
+from reachy_tts.kinematics import HOP_MS
+from reachy_tts.robots import Robot, RobotPool
+from benchmarks.bench_kinematics import synth_speech, streaming_footprint
+from benchmarks.fakes import FakeReachy, FakeTTSServer, NullAudioEngine
+
+TEXT = (
+    "Hello everyone, and welcome to the lab. I am Reachy, a small expressive robot. "
+    "Today I will walk you through what we have been building, how it works, "
+    "and why moving my head while I talk makes conversations feel so much more natural."
+)
+
+def _cadence(times: List[float], period_ms: float) -> Dict[str, float]:
+    if len(times) < 2:
+        return {"set_target_calls": len(times), "interval_mean_ms": 0.0, "jitter_ms": 0.0, "jitter_p95_ms": 0.0}
+    intervals = np.diff(times) * 1000.0
+    deviation = np.abs(intervals - period_ms)
+    return {
+        "set_target_calls": len(times),
+        "interval_mean_ms": float(intervals.mean()),
+        "jitter_ms": float(intervals.std()),
+        "jitter_p95_ms": float(np.percentile(deviation, 95)),
+    }
+
+def _measure(speak, reachy: FakeReachy, engine: NullAudioEngine, control_hz: float) -> Dict[str, Any]:
+    reachy.set_target_times.clear()
+    n_streams = len(engine.streams)
+    cpu0 = time.process_time()
+    t0 = time.monotonic()
+    stats = speak() or {}
+    elapsed = time.monotonic() - t0
+    cpu = time.process_time() - cpu0
+
+    out = engine.streams[n_streams] if len(engine.streams) > n_streams else None
+    audio_s = out.frames / out.rate if out else 0.0
+    hops = stats.get("hops") or int(audio_s * 1000.0 / HOP_MS)
+    return {
+        "time_to_first_audio_s": (out.first_write - t0) if out and out.first_write else None,
+        "end_to_end_s": elapsed,
+        "audio_s": audio_s,
+        "overruns_late": stats.get("late", 0),
+        "overruns_skipped": stats.get("skipped", 0),
+        "overruns_dropped": stats.get("dropped", 0),
+        "underruns": stats.get("underruns", 0),
+        "cpu_per_hop_us": cpu / hops * 1e6 if hops else None,
+        **_cadence(reachy.set_target_times, 1000.0 / control_hz),
+    }
+
+def _summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"runs": len(runs)}
+    for key in runs[0]:
+        values = [r[key] for r in runs if r[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+def bench_cli(base_url: str, mode: str, fast: bool, repeat: int, goto_scale: float, control_hz: float, set_target_ms: float = 0.0) -> Dict[str, Any]:
+    client = OpenAI(api_key="offline-bench", base_url=base_url)
+    reachy = FakeReachy(goto_scale, set_target_ms / 1000.0)
+    engine = NullAudioEngine(core.OPENAI_SR)
+
+    def speak():
+        return core._execute_tts_movement(
+            reachy, client, TEXT, "alloy", "tts-1", None,
+            stream=(mode == "stream"), segmented=(mode == "segmented"), engine=engine, fast=fast, control_hz=control_hz
+        )
+
+    runs = [_measure(speak, reachy, engine, control_hz) for _ in range(repeat)]
+    core._cancel_neutral_return(reachy)
+    return _summarize(runs)
+
+def bench_server(base_url: str, fast: bool, repeat: int, goto_scale: float, control_hz: float, set_target_ms: float = 0.0) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    import reachy_tts.server as server_module
+
+    reachy = FakeReachy(goto_scale, set_target_ms / 1000.0)
+    engine = NullAudioEngine(core.OPENAI_SR)
+    server_module._ROBOT_POOL = RobotPool([Robot("default", reachy)])
+    server_module._GLOBAL_BACKEND = OpenAIBackend(client=OpenAI(api_key="offline-bench", base_url=base_url))
+    server_module._GLOBAL_AUDIO = engine
+    server_module._GLOBAL_CACHE = None
+    server_module._FAST_MODE = fast
+    server_module._CONTROL_HZ = control_hz
+    http = TestClient(server_module.app)
+
+    def speak():
+        response = http.post("/tts", json={"text": TEXT, "stream": True, "wait": True})
+        response.raise_for_status()
+        return None
+
+    runs = [_measure(speak, reachy, engine, control_hz) for _ in range(repeat)]
+    core._cancel_neutral_return(reachy)
+    return _summarize(runs)
+
+def bench_format(server: FakeTTSServer, fmt: str, fast: bool, repeat: int, goto_scale: float, control_hz: float, set_target_ms: float = 0.0) -> Dict[str, Any]:
+    backend = HTTPBackend(f"{server.base_url}/audio/speech", formats=FormatSelector(fmt))
+    reachy = FakeReachy(goto_scale, set_target_ms / 1000.0)
+    engine = NullAudioEngine(core.OPENAI_SR)
+
+    def speak():
+        return core._execute_tts_movement(reachy, backend, TEXT, "alloy", "tts-1", None, stream=True, engine=engine, fast=fast, control_hz=control_hz)
+
+    runs = []
+    for _ in range(repeat):
+        sent = server.bytes_sent
+        run = _measure(speak, reachy, engine, control_hz)
+        run["bytes_transferred"] = server.bytes_sent - sent
+        runs.append(run)
+    core._cancel_neutral_return(reachy)
+    backend.close()
+    return _summarize(runs)
+
+def bench_kinematics(seconds: float) -> Dict[str, Any]:
+    sr = core.OPENAI_SR
+    pcm = synth_speech(seconds, sr)
+    mem, per_hop = streaming_footprint(pcm, sr)
+    return {"audio_s": seconds, "cpu_per_hop_us": per_hop * 1e6, "peak_bytes_per_instance": mem}
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end reachy-tts benchmark")
+    parser.add_argument("--ttfb", type=float, default=0.3, help="Fake TTS time-to-first-byte in seconds")
+    parser.add_argument("--chunk-bytes", type=int, default=4800, help="Fake TTS response chunk size")
+    parser.add_argument("--bandwidth", type=float, default=96000.0, help="Fake TTS transfer rate in bytes/s (0 = unlimited)")
+    parser.add_argument("--fast", action="store_true", help="Use fast mode (no zeroing/neutral-return moves)")
+    parser.add_argument("--control-hz", type=float, default=core.DEFAULT_CONTROL_HZ, help="Rate of head targets sent to the fake robot")
+    parser.add_argument("--goto-scale", type=float, default=1.0, help="Scale applied to the fake robot's goto_target durations")
+    parser.add_argument("--set-target-ms", type=float, default=0.0, help="Round-trip time of each set_target call on the fake robot")
+    parser.add_argument("--formats", type=str, default="pcm,opus,aac,mp3,auto", help="Comma-separated TTS transfer formats to compare on the streaming path")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=str, help="Write results to this file as JSON")
+    args = parser.parse_args()
+
+    server = FakeTTSServer(ttfb_s=args.ttfb, chunk_bytes=args.chunk_bytes, bytes_per_s=args.bandwidth or None).start()
+    try:
+        results = {
+            "config": vars(args),
+            "cli": {mode: bench_cli(server.base_url, mode, args.fast, args.repeat, args.goto_scale, args.control_hz, args.set_target_ms) for mode in ("buffered", "stream", "segmented")},
+            "server": bench_server(server.base_url, args.fast, args.repeat, args.goto_scale, args.control_hz, args.set_target_ms),
+            "formats": {
+                fmt: bench_format(server, fmt, args.fast, args.repeat, args.goto_scale, args.control_hz, args.set_target_ms)
+                for fmt in args.formats.split(",") if fmt == "pcm" or ffmpeg_available()
+            },
+            "kinematics": bench_kinematics(60.0),
+            "tts_requests": server.requests,
+            "tts_bytes": server.bytes_sent,
+        }
+    finally:
+        server.stop()
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    results["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Head-sway analysis benchmark: checks that the vectorized `sway_trajectory` matches the
+streaming `SwayRollRT.feed` (fed hop by hop) and times both on a minute of synthetic speech-like audio,
+then reports the per-instance memory and per-hop CPU of the streaming path, and compares the
+streaming polyphase resampler with the previous per-chunk linear one.
+
+Run from the repository root:  python -m benchmarks.bench_kinematics [--seconds 60]
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+
+from reachy_tts.kinematics import SwayRollRT, PolyphaseResampler, sway_trajectory, _resample_linear, SR
+
+KEYS = ("pitch_rad", "yaw_rad", "roll_rad", "x_mm", "y_mm", "z_mm")
+
+def synth_speech(seconds: float, sr: int = 24000, seed: int = 0) -> np.ndarray:
+    """Noise modulated by syllable-rate bursts and pauses, as int16 PCM."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    syllables = np.clip(np.sin(2 * np.pi * 4.0 * t), 0.0, None)
+    phrases = (np.sin(2 * np.pi * 0.2 * t) > -0.3).astype(np.float64)
+    level = 10 ** rng.uniform(-2.0, 0.0, size=n // sr + 1)[t.astype(int)]
+    x = rng.standard_normal(n) * syllables * phrases * level * 0.3
+    return np.clip(x * 32767, -32768, 32767).astype(np.int16)
+
+def check_parity(pcm: np.ndarray, sr: int) -> float:
+    # Fed one 50 ms hop at a time, as the speak path does (tests/test_kinematics.py checks the same)
+    sway = SwayRollRT()
+    hop = sr // 20
+    streamed = [pose for i in range(0, pcm.size, hop) for pose in sway.feed(pcm[i : i + hop], sr)]
+    batch = sway_trajectory(pcm, sr)
+    assert len(streamed) == batch["pitch_rad"].size, (len(streamed), batch["pitch_rad"].size)
+    worst = 0.0
+    for k in KEYS:
+        ref = np.array([r[k] for r in streamed])
+        worst = max(worst, float(np.max(np.abs(ref - batch[k]), initial=0.0)))
+    assert worst < 1e-9, f"trajectory mismatch: max abs diff {worst}"
+    return worst
+
+def bench(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def streaming_footprint(pcm: np.ndarray, sr: int, instances: int = 8):
+    """Peak traced bytes per live instance and mean `process` time per 50 ms hop."""
+    hop = sr // 20
+    hops = [pcm[i : i + hop] for i in range(0, pcm.size - hop + 1, hop)]
+    SwayRollRT().process(hops[0], sr)  # Build shared filter tables outside the measurement
+
+    tracemalloc.start()
+    live = [SwayRollRT(rng_seed=i) for i in range(instances)]
+    for chunk in hops:
+        for sway in live:
+            sway.process(chunk, sr)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sway = SwayRollRT()
+    start = time.perf_counter()
+    for chunk in hops:
+        sway.process(chunk, sr)
+    per_hop = (time.perf_counter() - start) / len(hops)
+    return peak / instances, per_hop
+
+def resampler_report(pcm: np.ndarray, sr: int, hop: int):
+    """Per-chunk time and allocations, sample-count drift and chunk-boundary error of both resamplers."""
+    x = pcm.astype(np.float32) / 32768.0
+    chunks = [x[i : i + hop] for i in range(0, x.size - hop + 1, hop)]
+    expected = len(chunks) * hop * SR / sr
+
+    def linear():
+        return [_resample_linear(c, sr, SR) for c in chunks]
+
+    def polyphase():
+        r = PolyphaseResampler(sr, SR)
+        return [r.process(c).copy() for c in chunks]
+
+    results = {}
+    for name, fn, whole in (
+        ("linear", linear, _resample_linear(x[: len(chunks) * hop], sr, SR)),
+        ("polyphase", polyphase, PolyphaseResampler(sr, SR).process(x[: len(chunks) * hop])),
+    ):
+        start = time.perf_counter()
+        out = fn()
+        per_hop = (time.perf_counter() - start) / len(chunks)
+
+        tracemalloc.start()
+        fn_out = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        kept = sum(o.nbytes for o in fn_out)
+
+        joined = np.concatenate(out)
+        n = min(joined.size, whole.size)
+        results[name] = {
+            "per_chunk_us": per_hop * 1e6,
+            "alloc_per_chunk_bytes": max(0, peak - kept) / len(chunks),
+            "drift_samples": joined.size - expected,
+            "max_chunking_error": float(np.max(np.abs(joined[:n] - whole[:n]), initial=0.0)),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="SwayRollRT streaming vs vectorized benchmark")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sr = 24000
+    pcm = synth_speech(args.seconds, sr)
+    worst = check_parity(pcm, sr)
+    print(f"parity: OK (max abs diff {worst:.3g})")
+
+    hop = sr // 20
+
+    def streaming_hops():
+        sway = SwayRollRT()
+        for i in range(0, pcm.size, hop):
+            sway.feed(pcm[i : i + hop], sr)
+
+    t_stream = bench(streaming_hops, args.repeat)
+    t_feed = bench(lambda: SwayRollRT().feed(pcm, sr), args.repeat)
+    t_batch = bench(lambda: sway_trajectory(pcm, sr), args.repeat)
+
+    print(f"audio: {args.seconds:.0f} s")
+    print(f"feed per 50 ms hop:  {t_stream * 1000:8.2f} ms")
+    print(f"feed whole buffer:   {t_feed * 1000:8.2f} ms")
+    print(f"sway_trajectory:     {t_batch * 1000:8.2f} ms  ({t_feed / t_batch:.1f}x vs feed, {t_stream / t_batch:.1f}x vs per-hop)")
+
+    mem, per_hop = streaming_footprint(pcm, sr)
+    print(f"streaming instance:  {mem / 1024:8.1f} KiB peak, {per_hop * 1e6:.1f} us per hop")
+
+    # 50 ms hops, and the 4 KiB chunks the network delivers
+    for chunk in (hop, 2048):
+        for name, r in resampler_report(pcm, sr, chunk).items():
+            print(
+                f"resample {name:<9} {chunk:5d}-sample chunks: {r['per_chunk_us']:6.1f} us and {r['alloc_per_chunk_bytes']:5.0f} B allocated per chunk, "
+                f"drift {r['drift_samples']:+.2f} samples, max chunking error {r['max_chunking_error']:.3g}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Local stand-ins for the robot, the TTS service and the audio device, so the full speak path can be
+exercised and timed offline.
+"""
+import json
+import time
+import shutil
+import threading
+import subprocess
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from benchmarks.bench_kinematics import synth_speech
+
+# ffmpeg encoder arguments of the compressed formats the fake TTS server can answer with
+ENCODERS = {
+    "opus": ["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"],
+    "aac": ["-c:a", "aac", "-b:a", "64k", "-f", "adts"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"],
+    "flac": ["-c:a", "flac", "-f", "flac"],
+}
+
+class FakeReachy:
+    """`ReachyMini` substitute that records when poses are sent; `goto_target` blocks like the real move
+    and `set_target` like a daemon round trip of `set_target_s`."""
+
+    def __init__(self, goto_scale: float = 1.0, set_target_s: float = 0.0):
+        self.goto_scale = goto_scale
+        self.set_target_s = set_target_s
+        self.set_target_times: List[float] = []
+        self.goto_calls = 0
+
+    def set_target(self, head=None, antennas=None, body_yaw=None):
+        self.set_target_times.append(time.monotonic())
+        if self.set_target_s:
+            time.sleep(self.set_target_s)
+
+    def goto_target(self, head=None, antennas=None, duration: float = 0.5, body_yaw=None):
+        self.goto_calls += 1
+        time.sleep(duration * self.goto_scale)
+
+class NullOutputStream:
+    """Discards PCM but blocks like a device that drains `buffer_ms` of queued audio in real time."""
+
+    def __init__(self, rate: int, buffer_ms: float = 100.0):
+        self.rate = rate
+        self.buffer_s = buffer_ms / 1000.0
+        self.first_write: Optional[float] = None
+        self.frames = 0
+        self._drained_at = 0.0  # monotonic time at which everything written so far has been played
+
+    def write(self, data: bytes):
+        now = time.monotonic()
+        if self.first_write is None:
+            self.first_write = now
+        self._drained_at = max(self._drained_at, now) + len(data) / 2 / self.rate
+        self.frames += len(data) // 2
+        ahead = self._drained_at - time.monotonic()
+        if ahead > self.buffer_s:
+            time.sleep(ahead - self.buffer_s)
+
+    def get_output_latency(self) -> float:
+        return self.buffer_s
+
+class NullAudioEngine:
+    """`AudioEngine` substitute handing out a fresh `NullOutputStream` per utterance."""
+
+    def __init__(self, rate: int = 24000, buffer_ms: float = 100.0):
+        self.rate = rate
+        self.buffer_ms = buffer_ms
+        self.streams: List[NullOutputStream] = []
+
+    def find_device(self, speaker):
+        return None, None
+
+    def prepare(self, speaker, rate=None):
+        pass
+
+    @contextmanager
+    def output(self, device_index, rate=None):
+        out = NullOutputStream(rate or self.rate, self.buffer_ms)
+        self.streams.append(out)
+        yield out
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakeTTSServer:
+    """Local HTTP server emulating the OpenAI speech endpoint (`POST /v1/audio/speech`).
+
+    `ttfb_s` delays the first byte, `chunk_bytes`/`bytes_per_s` shape the transfer and `ms_per_char`
+    sets how much audio is produced per input character. Raw PCM is always available; the formats
+    in `ENCODERS` are encoded with ffmpeg when it is installed.
+    """
+
+    def __init__(self, ttfb_s: float = 0.3, chunk_bytes: int = 4800, bytes_per_s: Optional[float] = 96000.0, ms_per_char: float = 60.0, sr: int = 24000):
+        self.ttfb_s = ttfb_s
+        self.chunk_bytes = chunk_bytes
+        self.bytes_per_s = bytes_per_s
+        self.ms_per_char = ms_per_char
+        self.sr = sr
+        self.requests = 0
+        self.bytes_sent = 0
+        self._encoded = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def render(self, text: str, response_format: str) -> bytes:
+        if response_format != "pcm" and (response_format not in ENCODERS or shutil.which("ffmpeg") is None):
+            raise ValueError(f"Unsupported response_format '{response_format}'")
+        seconds = max(0.2, len(text) * self.ms_per_char / 1000.0)
+        pcm = synth_speech(seconds, self.sr, seed=len(text)).tobytes()
+        if response_format == "pcm":
+            return pcm
+        key = (text, response_format)
+        if key not in self._encoded:  # Encoded once, so encoding time never shows up as server latency
+            self._encoded[key] = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", str(self.sr), "-ac", "1", "-i", "pipe:0", *ENCODERS[response_format], "pipe:1"],
+                input=pcm, stdout=subprocess.PIPE, check=True
+            ).stdout
+        return self._encoded[key]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/audio/speech"):
+                    self.send_error(404)
+                    return
+                fmt = body.get("response_format", "mp3")
+                try:
+                    payload = server.render(body.get("input", ""), fmt)
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                with server._lock:
+                    server.requests += 1
+
+                time.sleep(server.ttfb_s)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                start = time.monotonic()
+                for i in range(0, len(payload), server.chunk_bytes):
+                    if server.bytes_per_s:
+                        delay = start + i / server.bytes_per_s - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                    chunk = payload[i : i + server.chunk_bytes]
+                    try:
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        return  # Client gave up on this request (e.g. failover)
+                    with server._lock:
+                        server.bytes_sent += len(chunk)
+
+        return Handler
+
+    def start(self) -> "FakeTTSServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
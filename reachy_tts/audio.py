@@ -1,51 +1,341 @@
-import subprocess
-import shutil
-import sys
-from typing import Optional
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import numpy as np
+import pyaudio
 
-def _get_macos_volume() -> int:
-    """Get the current macOS system volume (0-100)."""
-    try:
-        res = subprocess.check_output(["osascript", "-e", "output volume of (get volume settings)"])
-        return int(res.strip())
-    except Exception:
-        return 50
+from reachy_tts import trace
 
-def _set_macos_volume(volume: int):
-    """Set the macOS system volume (0-100)."""
-    try:
-        subprocess.run(["osascript", "-e", f"set volume output volume {volume}"], check=True)
-    except Exception as e:
-        print(f"Warning: Could not set volume: {e}", file=sys.stderr)
-
-def _try_switch_audio_source(device_name: str) -> Optional[str]:
-    """Attempts to switch the macOS default audio output to the target device using SwitchAudioSource."""
-    if not shutil.which("SwitchAudioSource"):
-        return None
-    try:
-        prev_device = subprocess.check_output(["SwitchAudioSource", "-c", "-t", "output"]).decode().strip()
-        if prev_device != device_name:
-            subprocess.run(
-                ["SwitchAudioSource", "-t", "output", "-s", device_name], 
-                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-            )
-            return prev_device
-    except Exception:
-        pass
-    return None
-
-def _restore_audio_source(device_name: str):
-    """Restores the previous audio device."""
-    if not shutil.which("SwitchAudioSource") or not device_name:
-        return
+# Silence block written by warm streams while no utterance is playing
+WARM_CHUNK_MS = 20
+# Minimum delay before a speaker that was not found triggers a new device scan (hot-plug)
+DEVICE_RESCAN_S = 5.0
+# Software volume: fade-in at the start of an utterance and ramp between volume changes
+GAIN_RAMP_MS = 5.0
+
+def volume_to_gain(volume: float) -> float:
+    """Linear amplitude for a 0-100 volume on a squared (roughly perceptual) curve; 100 is unity, above boosts."""
+    return (max(0.0, float(volume)) / 100.0) ** 2
+
+class GainStage:
+    """Software volume: a vectorized gain on int16 PCM, clipped to the sample range.
+
+    With `ramp_ms`, the gain fades in from silence at the start and every `set_volume` moves to the
+    new gain linearly over that time instead of jumping, so neither causes a click.
+    """
+
+    def __init__(self, volume: float, sr: int, ramp_ms: float = GAIN_RAMP_MS):
+        self.target = volume_to_gain(volume)
+        self.ramp_frames = int(sr * ramp_ms / 1000.0)
+        self.gain = 0.0 if self.ramp_frames else self.target
+        self._step = self.target / self.ramp_frames if self.ramp_frames else 0.0
+
+    def set_volume(self, volume: float):
+        self.target = volume_to_gain(volume)
+        if self.ramp_frames:
+            self._step = (self.target - self.gain) / self.ramp_frames
+        else:
+            self.gain = self.target
+
+    def process(self, block: bytes) -> bytes:
+        x = np.frombuffer(block, dtype=np.int16, count=len(block) // 2)
+        if self.gain == self.target:
+            if self.gain == 1.0:
+                return block
+            y = x * np.float32(self.gain)
+        else:
+            ramp = self.gain + self._step * np.arange(1, x.size + 1, dtype=np.float32)
+            ramp = np.minimum(ramp, self.target) if self._step > 0 else np.maximum(ramp, self.target)
+            y = x * ramp
+            if x.size:
+                self.gain = self.target if ramp[-1] == np.float32(self.target) else float(ramp[-1])
+        return np.clip(y, -32768.0, 32767.0).astype(np.int16).tobytes()
+
+class PlaybackClock:
+    """Maps PCM frame indices to the monotonic time at which they are heard.
+
+    The playback thread reports every block just before writing it. Audio written to an idle device
+    is heard `latency` seconds later; when a write arrives after the device has already played
+    everything written so far (an underrun, e.g. a network stall), the clock is re-anchored so the
+    new block starts playing "now". `on_start` is called once, right after the first block is reported.
+    """
+
+    def __init__(self, sr: int, latency: float = 0.0, on_start: Optional[Callable[[], None]] = None):
+        self.sr = sr
+        self.latency = latency
+        self.on_start = on_start
+        self.started = threading.Event()
+        self.underruns = 0
+        self.first_write_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._frames_written = 0
+        self._anchor: Optional[float] = None  # monotonic time at which frame 0 is heard
+        self._closed = False
+
+    def on_write(self, n_frames: int):
+        now = time.monotonic()
+        first = self._anchor is None
+        with self._cond:
+            if first:
+                self.first_write_at = now
+                self._anchor = now + self.latency
+            elif now + self.latency > self.time_of_frame(self._frames_written):
+                # Device ran dry before this block arrived: it starts playing as soon as it lands
+                self._anchor = now + self.latency - self._frames_written / self.sr
+                self.underruns += 1
+            self._frames_written += n_frames
+            self._cond.notify_all()
+        self.started.set()
+        if first and self.on_start is not None:
+            self.on_start()
+
+    def time_of_frame(self, frame: int) -> float:
+        return self._anchor + frame / self.sr
+
+    def wait_written(self, frame: int) -> bool:
+        """Blocks until `frame` has been handed to the device; False if playback ended before that."""
+        with self._cond:
+            while self._frames_written <= frame and not self._closed:
+                self._cond.wait()
+            return self._frames_written > frame
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.started.set()
+
+def play_audio_queue_thread(stream, hops, prebuffer_hops: int, clock: PlaybackClock, cancel=None, gain: Optional[GainStage] = None):
+    """Play PCM blocks from a queue until a None sentinel (or `cancel` is set), holding back a small jitter buffer first.
+
+    `gain` is applied here, on the way to the device only, so anything else reading the same audio sees it unscaled.
+    """
+    def _write(block: bytes):
+        if gain is not None:
+            block = gain.process(block)
+        clock.on_write(len(block) // 2)
+        with trace.span("audio.write", frames=len(block) // 2):
+            stream.write(block)
+
+    pending = []
     try:
-        subprocess.run(
-            ["SwitchAudioSource", "-t", "output", "-s", device_name],
-            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-    except Exception:
-        pass
-
-def play_audio_thread(stream, pcm_data):
-    """Play the synthesized audio byte sequence to the speaker."""
-    stream.write(pcm_data)
+        while True:
+            hop = hops.get()
+            if hop is None:
+                break
+            if cancel is not None and cancel.is_set():
+                return  # Stop mid-utterance: only what the device already holds is still heard
+            if clock.started.is_set():
+                _write(hop)
+                continue
+            pending.append(hop)
+            if len(pending) >= prebuffer_hops:
+                _write(b"".join(pending))
+                pending = []
+        # Utterance shorter than the jitter buffer: flush whatever arrived
+        if pending and (cancel is None or not cancel.is_set()):
+            _write(b"".join(pending))
+    finally:
+        clock.close()
+
+def fade_edges(pcm: bytes, sr: int, fade_ms: float = 4.0) -> bytes:
+    """Applies a short raised-cosine fade-in/out to int16 PCM so concatenated segments join without clicks."""
+    x = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2)
+    n = min(int(sr * fade_ms / 1000.0), x.size // 2)
+    if n == 0:
+        return pcm
+    ramp = 0.5 - 0.5 * np.cos(np.linspace(0.0, np.pi, n, endpoint=False))
+    y = x.copy()
+    y[:n] = (x[:n] * ramp).astype(np.int16)
+    y[-n:] = (x[-n:] * ramp[::-1]).astype(np.int16)
+    return y.tobytes()
+
+def _find_output_device(p, speaker: Optional[str]):
+    """Returns (index, name) of the first output device whose name contains `speaker`."""
+    if not speaker:
+        return None, None
+    for i in range(p.get_device_count()):
+        try:
+            info = p.get_device_info_by_index(i)
+            if info.get("maxOutputChannels", 0) > 0 and speaker.lower() in info.get("name", "").lower():
+                return i, info.get("name")
+        except Exception:
+            pass
+    return None, None
+
+class _OutputStream:
+    """A pre-opened mono int16 output stream that can be leased by one utterance at a time.
+
+    With `keep_warm`, a background thread writes silence whenever the stream is not leased so the
+    device never idles down and the first frames of the next utterance are not dropped.
+    """
+
+    def __init__(self, p, device_index: Optional[int], rate: int, keep_warm: bool):
+        stream_kwargs = {
+            "format": pyaudio.paInt16,
+            "channels": 1,
+            "rate": rate,
+            "output": True
+        }
+        if device_index is not None:
+            stream_kwargs["output_device_index"] = device_index
+        self.stream = p.open(**stream_kwargs)
+        self._cond = threading.Condition()
+        self._leased = False
+        self._closed = False
+        if keep_warm:
+            self._silence = bytes(int(rate * WARM_CHUNK_MS / 1000) * 2)
+            threading.Thread(target=self._feed_silence, daemon=True).start()
+
+    def _feed_silence(self):
+        while True:
+            with self._cond:
+                while self._leased and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                try:
+                    self.stream.write(self._silence)
+                except OSError:
+                    return
+
+    def lease(self):
+        with self._cond:
+            while self._leased:
+                self._cond.wait()
+            self._leased = True
+
+    def release(self):
+        with self._cond:
+            self._leased = False
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except OSError:
+                pass
+
+class AudioEngine:
+    """Long-lived PyAudio owner: cached speaker lookup and pre-opened output streams reused across utterances.
+
+    A speaker that was missing is looked up again after DEVICE_RESCAN_S on a throwaway PyAudio
+    instance. Once it shows up, or after a stream fails to open or write, the shared instance is
+    re-initialized (the only way PortAudio sees hot-plugged devices) as soon as no utterance holds a
+    stream, so streams in use are never closed underneath their writer.
+    """
+
+    def __init__(self, rate: int = 24000, keep_warm: bool = False):
+        self.rate = rate
+        self.keep_warm = keep_warm
+        self._lock = threading.RLock()
+        self._pa = pyaudio.PyAudio()
+        self._devices: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+        self._streams: Dict[Tuple[Optional[int], int], _OutputStream] = {}
+        self._scanned_at = time.monotonic()
+        self._in_use = 0  # Utterances holding (or waiting for) a stream
+        self._stale = False  # PortAudio must be re-initialized once no stream is in use
+
+    def find_device(self, speaker: Optional[str]):
+        """Cached `_find_output_device`."""
+        if not speaker:
+            return None, None
+        key = speaker.lower()
+        with self._lock:
+            cached = self._devices.get(key)
+            if cached is not None:
+                if cached[0] is not None or time.monotonic() - self._scanned_at < DEVICE_RESCAN_S:
+                    return cached
+                # The speaker was missing last time: it may have been plugged in since
+                self._scanned_at = time.monotonic()
+                if self._rescan(speaker)[0] is None or not self.invalidate():
+                    return cached
+            found = _find_output_device(self._pa, speaker)
+            self._devices[key] = found
+            return found
+
+    @staticmethod
+    def _rescan(speaker: str):
+        """`_find_output_device` on a PyAudio instance of its own, which sees the devices present right now."""
+        p = pyaudio.PyAudio()
+        try:
+            return _find_output_device(p, speaker)
+        finally:
+            p.terminate()
+
+    def prepare(self, speaker: Optional[str], rate: Optional[int] = None):
+        """Opens (and keeps) the output stream for a speaker ahead of the first utterance."""
+        device_index, _ = self.find_device(speaker)
+        self._get_stream(device_index, rate or self.rate)
+
+    def _get_stream(self, device_index: Optional[int], rate: int) -> _OutputStream:
+        with self._lock:
+            out = self._streams.get((device_index, rate))
+            if out is None:
+                try:
+                    out = _OutputStream(self._pa, device_index, rate, self.keep_warm)
+                except OSError:
+                    self.invalidate()
+                    raise
+                self._streams[(device_index, rate)] = out
+            return out
+
+    @contextmanager
+    def output(self, device_index: Optional[int], rate: Optional[int] = None) -> Iterator:
+        """Leases the running output stream of a device for the duration of one utterance."""
+        key = (device_index, rate or self.rate)
+        with trace.span("audio.open_stream", device=device_index):
+            with self._lock:
+                out = self._get_stream(*key)
+                self._in_use += 1
+        try:
+            out.lease()
+            try:
+                yield out.stream
+            except OSError:
+                # Only this stream is dropped; others keep playing and PortAudio is reset once idle
+                with self._lock:
+                    if self._streams.get(key) is out:
+                        del self._streams[key]
+                    self._stale = True
+                out.close()
+                raise
+            finally:
+                out.release()
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if self._stale:
+                    self.invalidate()
+
+    def invalidate(self) -> bool:
+        """Closes every stream and forgets cached devices, re-initializing PortAudio.
+
+        Deferred while a stream is in use (the last utterance to finish does it then); returns
+        whether it happened now.
+        """
+        with self._lock:
+            if self._in_use:
+                self._stale = True
+                return False
+            for out in self._streams.values():
+                out.close()
+            self._streams.clear()
+            self._devices.clear()
+            self._pa.terminate()
+            self._pa = pyaudio.PyAudio()
+            self._scanned_at = time.monotonic()
+            self._stale = False
+            return True
+
+    def close(self):
+        with self._lock:
+            for out in self._streams.values():
+                out.close()
+            self._streams.clear()
+            self._pa.terminate()
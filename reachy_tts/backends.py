@@ -0,0 +1,633 @@
+import io
+import os
+import math
+import sys
+import time
+import wave
+import queue
+import shutil
+import tempfile
+import socket
+import threading
+import subprocess
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+import numpy as np
+import httpx
+
+from reachy_tts import metrics
+from reachy_tts.decode import COMPRESSED_FORMATS, decode_compressed, ffmpeg_available
+from reachy_tts.defaults import BACKEND_NAMES, TTS_FORMATS, DEFAULT_HEDGE_PERCENTILE, DEFAULT_DEADLINE_S
+
+# Every backend delivers 16-bit mono PCM at this rate (the native OpenAI PCM format)
+BACKEND_SR = 24000
+# Keep-alive pool shared by all requests to a remote backend, so only the first utterance pays for TCP/TLS setup
+POOL_CONNECTIONS = 8
+KEEPALIVE_EXPIRY_S = 300.0
+# After a failover, the remote backend is skipped for this long instead of paying the budget on every utterance
+FAILOVER_COOLDOWN_S = 30.0
+# Chunks a pump thread reads ahead of the consumer, so slow playback slows the download instead of filling memory
+PUMP_QUEUE_CHUNKS = 32
+# How often a pump blocked on a full queue checks whether it was abandoned
+PUMP_POLL_S = 0.1
+# Hedging: a duplicate request is sent once the first byte is later than `DEFAULT_HEDGE_PERCENTILE` of recent ones
+HEDGE_WINDOW = 100  # Recent times-to-first-byte the percentile is taken over
+HEDGE_MIN_SAMPLES = 10  # Below this many, `HEDGE_INITIAL_S` is used instead
+HEDGE_INITIAL_S = 1.5
+HEDGE_MIN_S = 0.25  # Floor, so ordinary jitter on a fast link never doubles the requests
+# Compressed format used when the link is too slow for raw PCM
+DEFAULT_COMPRESSED_FORMAT = "opus"
+# Raw PCM is used while the measured download rate is at least this multiple of its 48 KB/s data rate
+PCM_HEADROOM = 2.0
+# While compressed audio is used, raw PCM is tried again this often to notice when the link has recovered
+FORMAT_PROBE_S = 60.0
+# Transfers shorter than this say little about the link and are not measured
+MIN_MEASURED_BYTES = 32 * 1024
+# Weight of the newest measurement in the bandwidth estimate
+BANDWIDTH_SMOOTHING = 0.5
+
+class Synthesis(NamedTuple):
+    """PCM chunks of one utterance and the name of the backend that actually produced them.
+
+    `abort`, when given, can be called from any thread to cut the transfer off, waking a reader that
+    is blocked on the network; `chunks` then ends with an error.
+    """
+    backend: str
+    chunks: Iterator[bytes]
+    abort: Optional[Callable[[], None]] = None
+
+class _ResponseHandle:
+    """The HTTP response a remote synthesis is reading, so that another thread can abort it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._response: Optional[httpx.Response] = None
+        self._aborted = False
+
+    def attach(self, response: httpx.Response) -> None:
+        with self._lock:
+            self._response = response
+            if self._aborted:
+                self._shutdown()
+
+    def detach(self) -> None:
+        """Called before the response is closed, so its connection is never cut once back in the pool."""
+        with self._lock:
+            self._response = None
+
+    def abort(self) -> None:
+        """Aborted before the response headers arrive, the response is dropped as soon as they do."""
+        with self._lock:
+            self._aborted = True
+            if self._response is not None:
+                self._shutdown()
+
+    def _shutdown(self) -> None:
+        stream = self._response.extensions.get("network_stream")
+        sock = stream.get_extra_info("socket") if stream is not None else None
+        if sock is None:
+            return
+        try:
+            # Plain socket shutdown, also under TLS: it wakes the blocked read without touching the SSL state
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class TTSBackend:
+    """Streaming text-to-speech source yielding raw 24 kHz int16 mono PCM."""
+
+    name = "base"
+
+    def open(self, text: str, voice: str, model: str, chunk_size: int = 4096) -> Synthesis:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        pass
+
+class FormatSelector:
+    """Picks the transfer format of each remote TTS request.
+
+    With "auto", raw PCM is used while the measured download bandwidth keeps well ahead of playback,
+    and `compressed` once it does not (only if ffmpeg is there to decode it). Bandwidth is measured on
+    PCM transfers, from the first byte to the last; compressed transfers are paced by synthesis rather
+    than by the link, so PCM is probed again every `probe_s`.
+    """
+
+    def __init__(self, fmt: str = "auto", compressed: str = DEFAULT_COMPRESSED_FORMAT, probe_s: float = FORMAT_PROBE_S):
+        if fmt not in TTS_FORMATS:
+            raise ValueError(f"Unknown TTS format '{fmt}' (expected one of: {', '.join(TTS_FORMATS)})")
+        self.fmt = fmt
+        self.compressed = compressed
+        self.probe_s = probe_s
+        self.bandwidth: Optional[float] = None  # bytes/s
+        self._measured_at = 0.0
+        self._lock = threading.Lock()
+        if fmt in COMPRESSED_FORMATS or fmt == "auto":
+            wanted = compressed if fmt == "auto" else fmt
+            if not ffmpeg_available():
+                print(f"Warning: ffmpeg not found; TTS audio will be requested as raw PCM instead of {wanted}.", file=sys.stderr)
+                self.fmt = "pcm"
+
+    def choose(self) -> str:
+        if self.fmt != "auto":
+            return self.fmt
+        with self._lock:
+            if self.bandwidth is None or time.monotonic() - self._measured_at > self.probe_s:
+                return "pcm"
+            return "pcm" if self.bandwidth >= PCM_HEADROOM * BACKEND_SR * 2 else self.compressed
+
+    def observe(self, fmt: str, n_bytes: int, seconds: float) -> None:
+        metrics.TTS_BYTES.inc(fmt, amount=n_bytes)
+        if fmt != "pcm" or n_bytes < MIN_MEASURED_BYTES or seconds <= 0:
+            return
+        rate = n_bytes / seconds
+        with self._lock:
+            self.bandwidth = rate if self.bandwidth is None else BANDWIDTH_SMOOTHING * rate + (1 - BANDWIDTH_SMOOTHING) * self.bandwidth
+            self._measured_at = time.monotonic()
+
+    def measure(self, fmt: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Passes a response's raw chunks through, reporting its size and transfer time once it ends.
+
+        Only the time spent waiting for chunks counts: the reader may be held back by playback, and the
+        wait for the first byte is synthesis latency rather than bandwidth.
+        """
+        source = iter(chunks)
+        n_bytes = 0
+        waited = 0.0
+        first = True
+        complete = False
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(source)
+                except StopIteration:
+                    break
+                if first:
+                    first = False
+                else:
+                    waited += time.perf_counter() - start
+                    n_bytes += len(chunk)
+                yield chunk
+            complete = True
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+            if not first:
+                self.observe(fmt, n_bytes, waited if complete else 0.0)
+
+    def decode(self, fmt: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """The measured response as 24 kHz int16 PCM."""
+        chunks = self.measure(fmt, chunks)
+        return chunks if fmt == "pcm" else decode_compressed(chunks, fmt, BACKEND_SR)
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=POOL_CONNECTIONS, max_keepalive_connections=POOL_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY_S)
+
+class OpenAIBackend(TTSBackend):
+    """OpenAI speech API over one long-lived client and keep-alive connection pool."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, client=None, formats: Optional[FormatSelector] = None):
+        if client is None:
+            from openai import OpenAI, DefaultHttpxClient
+            client = OpenAI(api_key=api_key, http_client=DefaultHttpxClient(limits=_pool_limits()))
+        self.client = client
+        self.formats = formats or FormatSelector("pcm")
+
+    def open(self, text: str, voice: str, model: str, chunk_size: int = 4096) -> Synthesis:
+        fmt = self.formats.choose()
+        handle = _ResponseHandle()
+        return Synthesis(self.name, self.formats.decode(fmt, self._stream(text, voice, model, chunk_size, fmt, handle)), handle.abort)
+
+    def _stream(self, text: str, voice: str, model: str, chunk_size: int, fmt: str = "pcm", handle: Optional[_ResponseHandle] = None) -> Iterator[bytes]:
+        with self.client.audio.speech.with_streaming_response.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format=fmt
+        ) as response:
+            if handle is not None:
+                handle.attach(response.http_response)
+            try:
+                for chunk in response.iter_bytes(chunk_size=chunk_size):
+                    yield chunk
+            finally:
+                if handle is not None:
+                    handle.detach()
+
+    def close(self):
+        self.client.close()
+
+class HTTPBackend(TTSBackend):
+    """Local or LAN TTS server exposing an OpenAI-compatible speech endpoint that returns 24 kHz PCM."""
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 30.0, formats: Optional[FormatSelector] = None):
+        self.url = url
+        self._client = httpx.Client(limits=_pool_limits(), timeout=timeout)
+        self.formats = formats or FormatSelector("pcm")
+
+    def open(self, text: str, voice: str, model: str, chunk_size: int = 4096) -> Synthesis:
+        fmt = self.formats.choose()
+        handle = _ResponseHandle()
+        return Synthesis(self.name, self.formats.decode(fmt, self._stream(text, voice, model, chunk_size, fmt, handle)), handle.abort)
+
+    def _stream(self, text: str, voice: str, model: str, chunk_size: int, fmt: str = "pcm", handle: Optional[_ResponseHandle] = None) -> Iterator[bytes]:
+        body = {"model": model, "voice": voice, "input": text, "response_format": fmt}
+        with self._client.stream("POST", self.url, json=body) as response:
+            response.raise_for_status()
+            if handle is not None:
+                handle.attach(response)
+            try:
+                for chunk in response.iter_bytes(chunk_size=chunk_size):
+                    yield chunk
+            finally:
+                if handle is not None:
+                    handle.detach()
+
+    def close(self):
+        self._client.close()
+
+def _wav_to_pcm(data: bytes, sr: int = BACKEND_SR) -> bytes:
+    """Decodes a 16-bit WAV into mono int16 PCM at `sr`."""
+    with wave.open(io.BytesIO(data)) as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"Unsupported WAV sample width: {w.getsampwidth() * 8} bits")
+        channels = w.getnchannels()
+        rate = w.getframerate()
+        frames = w.readframes(w.getnframes())
+    x = np.frombuffer(frames, dtype=np.int16, count=len(frames) // 2)
+    if channels > 1:
+        x = x[: x.size - x.size % channels].reshape(-1, channels).mean(axis=1)
+    if rate != sr and x.size:
+        n_out = int(round(x.size * sr / rate))
+        x = np.interp(np.arange(n_out) * (rate / sr), np.arange(x.size), x)
+    return np.asarray(x).astype(np.int16).tobytes()
+
+class LocalBackend(TTSBackend):
+    """Offline CPU speech engine: macOS `say` or `espeak-ng`/`espeak`, whichever is installed."""
+
+    name = "local"
+
+    def __init__(self, voice: Optional[str] = None):
+        self.voice = voice
+        self.engine = next((e for e in ("say", "espeak-ng", "espeak") if shutil.which(e)), None)
+
+    def _command(self, out_path: Optional[str]) -> List[str]:
+        voice = ["-v", self.voice] if self.voice else []
+        if self.engine == "say":
+            return ["say", *voice, "-f", "-", "-o", out_path, "--file-format=WAVE", f"--data-format=LEI16@{BACKEND_SR}"]
+        return [self.engine, *voice, "--stdin", "--stdout"]
+
+    def render(self, text: str) -> bytes:
+        """Synthesizes a whole utterance and returns it as PCM."""
+        if self.engine is None:
+            raise RuntimeError("No local TTS engine found (install espeak-ng, or use macOS `say`).")
+        if self.engine == "say":
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                subprocess.run(self._command(path), input=text.encode("utf-8"), check=True, capture_output=True)
+                with open(path, "rb") as f:
+                    data = f.read()
+            finally:
+                os.remove(path)
+        else:
+            data = subprocess.run(self._command(None), input=text.encode("utf-8"), check=True, capture_output=True).stdout
+        return _wav_to_pcm(data)
+
+    def open(self, text: str, voice: str, model: str, chunk_size: int = 4096) -> Synthesis:
+        return Synthesis(self.name, self._stream(text, chunk_size))
+
+    def _stream(self, text: str, chunk_size: int) -> Iterator[bytes]:
+        pcm = self.render(text)
+        for i in range(0, len(pcm), chunk_size):
+            yield pcm[i : i + chunk_size]
+
+def _put_unless(q: queue.Queue, item, abandoned: threading.Event) -> bool:
+    """Puts into a bounded queue, giving up (False) once the consumer has abandoned it."""
+    while not abandoned.is_set():
+        try:
+            q.put(item, timeout=PUMP_POLL_S)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _aborted() -> ConnectionAbortedError:
+    return ConnectionAbortedError("TTS request aborted")
+
+def _wake(q: queue.Queue) -> None:
+    """Unblocks a consumer waiting on an empty queue after its transfer was aborted."""
+    try:
+        q.put_nowait(_aborted())
+    except queue.Full:
+        pass  # Not waiting: it checks for the abort before its next read
+
+class FailoverBackend(TTSBackend):
+    """Uses `primary` unless it fails or sends no audio within `budget_s`, then switches to `fallback`."""
+
+    def __init__(self, primary: TTSBackend, fallback: TTSBackend, budget_s: float, cooldown_s: float = FAILOVER_COOLDOWN_S):
+        self.primary = primary
+        self.fallback = fallback
+        self.budget_s = budget_s
+        self.cooldown_s = cooldown_s
+        self.name = primary.name
+        self._skip_until = 0.0
+
+    def open(self, text: str, voice: str, model: str, chunk_size: int = 4096) -> Synthesis:
+        if time.monotonic() < self._skip_until:
+            return self.fallback.open(text, voice, model, chunk_size)
+
+        synthesis = self.primary.open(text, voice, model, chunk_size)
+        chunks: queue.Queue = queue.Queue(maxsize=PUMP_QUEUE_CHUNKS)
+        abandoned = threading.Event()
+
+        def _pump():
+            try:
+                for chunk in synthesis.chunks:
+                    if not _put_unless(chunks, chunk, abandoned):
+                        break
+            except Exception as e:
+                _put_unless(chunks, e, abandoned)
+            finally:
+                synthesis.chunks.close()
+                _put_unless(chunks, None, abandoned)
+
+        threading.Thread(target=_pump, name=f"tts-{self.primary.name}", daemon=True).start()
+        try:
+            first = chunks.get(timeout=self.budget_s)
+        except queue.Empty:
+            first = TimeoutError(f"no audio within {self.budget_s * 1000:.0f} ms")
+        if isinstance(first, Exception):
+            abandoned.set()
+            self._skip_until = time.monotonic() + self.cooldown_s
+            metrics.FAILOVERS.inc(self.primary.name)
+            print(f"Warning: TTS backend '{self.primary.name}' failed ({first}); using '{self.fallback.name}'.", file=sys.stderr)
+            return self.fallback.open(text, voice, model, chunk_size)
+
+        def _abort():
+            abandoned.set()
+            if synthesis.abort is not None:
+                synthesis.abort()
+            _wake(chunks)
+
+        return Synthesis(synthesis.backend, self._drain(first, chunks, abandoned), _abort)
+
+    @staticmethod
+    def _drain(first, chunks: queue.Queue, abandoned: threading.Event) -> Iterator[bytes]:
+        try:
+            item = first
+            while item is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                if abandoned.is_set():
+                    raise _aborted()
+                item = chunks.get()
+        finally:
+            abandoned.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.primary.stats()
+
+    def close(self):
+        self.primary.close()
+
+def _transient(e: Exception) -> bool:
+    """Whether a failed request may succeed if sent again: network trouble, a timeout, a 429 or a 5xx."""
+    status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else getattr(e, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(e, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        from openai import APIConnectionError  # Also covers APITimeoutError
+    except ImportError:
+        return False
+    return isinstance(e, APIConnectionError)
+
+class HedgedBackend(TTSBackend):
+    """Bounds the latency of `inner`: hedges a late first byte with a duplicate request, and fails past a deadline.
+
+    When the first byte is later than the `percentile` of recent times-to-first-byte, the same
+    request is sent again and whichever answers first is used; the other one is aborted. A request
+    fails with TimeoutError when no attempt has answered within `deadline_s`, or when the audio
+    stalls for that long, so a stuck connection cannot hold a robot forever. A `FailoverBackend`
+    around it then falls back to the offline engine.
+    """
+
+    def __init__(self, inner: TTSBackend, percentile: Optional[float] = DEFAULT_HEDGE_PERCENTILE, deadline_s: Optional[float] = DEFAULT_DEADLINE_S):
+        self.inner = inner
+        self.percentile = percentile
+        self.deadline_s = deadline_s
+        self.name = inner.name
+        self._counts = {"requests": 0, "hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0}
+        self._ttfb: List[float] = []
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def hedge_after(self) -> Optional[float]:
+        """Delay before the duplicate request is sent, None when hedging is off."""
+        if not self.percentile:
+            return None
+        with self._lock:
+            recent = sorted(self._ttfb)
+        if len(recent) < HEDGE_MIN_SAMPLES:
+            return HEDGE_INITIAL_S
+        index = min(len(recent) - 1, max(0, math.ceil(self.percentile / 100.0 * len(recent)) - 1))
+        return max(HEDGE_MIN_S, recent[index])
+
+    def stats(self) -> Dict[str, Any]:
+        hedge_after = self.hedge_after()
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            **counts,
+            "hedge_rate": counts["hedged"] / counts["requests"] if counts["requests"] else 0.0,
+            "hedge_win_rate": counts["hedge_wins"] / counts["hedged"] if counts["hedged"] else 0.0,
+            "hedge_after_ms": hedge_after * 1000.0 if hedge_after is not None else None,
+        }
+
+    def open(self, text: str, voice: str, model: str, chunk_size: int = 4096) -> Synthesis:
+        firsts: queue.Queue = queue.Queue()  # (attempt, first chunk or exception), one per attempt
+        attempts = []
+        aborted = threading.Event()
+
+        def _abort():
+            aborted.set()
+            firsts.put((None, _aborted()))
+            for attempt in list(attempts):
+                self._abandon(attempt)
+                _wake(attempt["chunks"])
+
+        return Synthesis(self.name, self._stream(text, voice, model, chunk_size, firsts, attempts, aborted), _abort)
+
+    def _stream(self, text: str, voice: str, model: str, chunk_size: int, firsts: queue.Queue, attempts: List[Dict[str, Any]], aborted: threading.Event) -> Iterator[bytes]:
+        start = time.monotonic()
+        deadline = start + self.deadline_s if self.deadline_s else None
+        hedge_at = start + self.hedge_after() if self.percentile else None
+        self._count("requests")
+
+        def _launch():
+            attempt = {"chunks": queue.Queue(maxsize=PUMP_QUEUE_CHUNKS), "abandoned": threading.Event(), "synthesis": None}
+            index = len(attempts)
+            attempts.append(attempt)
+
+            def _pump():
+                first = True
+                abandoned = attempt["abandoned"]
+                try:
+                    synthesis = self.inner.open(text, voice, model, chunk_size)
+                    attempt["synthesis"] = synthesis
+                    if abandoned.is_set():
+                        self._abandon(attempt)  # Lost before the handle was stored
+                    try:
+                        for chunk in synthesis.chunks:
+                            if abandoned.is_set():
+                                break
+                            if first:
+                                firsts.put((index, chunk))
+                                first = False
+                            elif not _put_unless(attempt["chunks"], chunk, abandoned):
+                                break
+                    finally:
+                        synthesis.chunks.close()
+                except Exception as e:
+                    if first:
+                        firsts.put((index, e))
+                    else:
+                        _put_unless(attempt["chunks"], e, abandoned)
+                    return
+                if first:
+                    firsts.put((index, RuntimeError("empty response")))
+                _put_unless(attempt["chunks"], None, abandoned)
+
+            threading.Thread(target=_pump, name=f"tts-{self.name}-{index}", daemon=True).start()
+
+        _launch()
+        errors = []
+        winner = None
+        while winner is None and not aborted.is_set():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            waits = [t for t in (deadline, hedge_at if len(attempts) == 1 else None) if t is not None]
+            try:
+                index, first = firsts.get(timeout=max(0.0, min(waits) - now) if waits else None)
+            except queue.Empty:
+                if len(attempts) == 1 and hedge_at is not None and time.monotonic() >= hedge_at and not aborted.is_set():
+                    self._count("hedged")
+                    metrics.HEDGES.inc(self.name)
+                    _launch()
+                continue
+            if index is None:
+                break  # Aborted
+            if isinstance(first, Exception):
+                errors.append(first)
+                if not _transient(first):
+                    break  # Rejected: sending it again would fail the same way
+                if len(errors) == len(attempts):
+                    if len(attempts) == 1 and self.percentile and not aborted.is_set():
+                        self._count("hedged")  # Nothing left in flight: retry right away rather than at the hedge delay
+                        metrics.HEDGES.inc(self.name)
+                        _launch()
+                        continue
+                    break
+                continue
+            winner = index
+
+        if winner is None:
+            for attempt in attempts:
+                self._abandon(attempt)
+            if aborted.is_set():
+                raise _aborted()
+            if errors and (len(errors) == len(attempts) or not _transient(errors[-1])):
+                raise errors[-1]
+            self._count("deadline_exceeded")
+            metrics.DEADLINES.inc(self.name)
+            raise TimeoutError(f"TTS backend '{self.name}' sent no audio within {self.deadline_s * 1000:.0f} ms")
+
+        for index, attempt in enumerate(attempts):
+            if index != winner:
+                self._abandon(attempt)
+        with self._lock:
+            self._ttfb.append(time.monotonic() - start)
+            del self._ttfb[:-HEDGE_WINDOW]
+        if winner > 0:
+            self._count("hedge_wins")
+            metrics.HEDGE_WINS.inc(self.name)
+        yield from self._drain(first, attempts[winner])
+
+    def _drain(self, first: bytes, attempt) -> Iterator[bytes]:
+        try:
+            item = first
+            while item is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                if attempt["abandoned"].is_set():
+                    raise _aborted()
+                try:
+                    item = attempt["chunks"].get(timeout=self.deadline_s)
+                except queue.Empty:
+                    self._count("deadline_exceeded")
+                    metrics.DEADLINES.inc(self.name)
+                    raise TimeoutError(f"TTS backend '{self.name}' stalled for {self.deadline_s * 1000:.0f} ms")
+        finally:
+            self._abandon(attempt)
+
+    @staticmethod
+    def _abandon(attempt) -> None:
+        """Stops an attempt's pump and cuts its transfer off, even while it is blocked on the network."""
+        attempt["abandoned"].set()
+        synthesis = attempt["synthesis"]
+        if synthesis is not None and synthesis.abort is not None:
+            synthesis.abort()
+
+    def close(self):
+        self.inner.close()
+
+def as_backend(client) -> TTSBackend:
+    """Wraps a bare OpenAI client so older callers keep working."""
+    return client if isinstance(client, TTSBackend) else OpenAIBackend(client=client)
+
+def create_backends(
+    api_key: Optional[str] = None,
+    url: Optional[str] = None,
+    local_voice: Optional[str] = None,
+    failover_s: Optional[float] = None,
+    tts_format: str = "pcm",
+    hedge_percentile: Optional[float] = DEFAULT_HEDGE_PERCENTILE,
+    deadline_s: Optional[float] = DEFAULT_DEADLINE_S,
+) -> Dict[str, TTSBackend]:
+    """Builds every configured backend by name; remote ones fail over to the local engine when `failover_s` is set.
+
+    `tts_format` is the transfer format of remote backends: "pcm", a compressed format or "auto".
+    Remote requests are hedged past the `hedge_percentile` of their times-to-first-byte and fail
+    after `deadline_s` without audio; 0 or None turns either off.
+    """
+    local = LocalBackend(local_voice)
+    backends: Dict[str, TTSBackend] = {"local": local}
+    if api_key:
+        backends["openai"] = OpenAIBackend(api_key, formats=FormatSelector(tts_format))
+    if url:
+        backends["http"] = HTTPBackend(url, formats=FormatSelector(tts_format))
+    if hedge_percentile or deadline_s:
+        for name in ("openai", "http"):
+            if name in backends:
+                backends[name] = HedgedBackend(backends[name], hedge_percentile, deadline_s)
+    if failover_s:
+        for name in ("openai", "http"):
+            if name in backends:
+                backends[name] = FailoverBackend(backends[name], local, failover_s)
+    return backends
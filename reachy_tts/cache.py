@@ -0,0 +1,213 @@
+import os
+import sys
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional
+
+from reachy_tts import metrics
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "reachy-tts")
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+# Precomputed head motion stored next to a cached utterance (`<key>.pcm`)
+MOTION_EXT = ".sway"
+
+def _normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different inputs share a cache entry."""
+    return " ".join(text.split())
+
+def iter_buffer(buf, chunk_size: int = 4096) -> Iterator[memoryview]:
+    """Yields zero-copy slices of a bytes-like (or mmap) object."""
+    view = memoryview(buf)
+    for i in range(0, len(view), chunk_size):
+        yield view[i : i + chunk_size]
+
+class PCMCache:
+    """Two-tier (in-memory LRU + on-disk) cache of synthesized raw PCM, keyed by (text, voice, model).
+
+    An on-disk entry can also carry the precomputed head motion of its audio (see `store_motion`),
+    which lives and dies with the PCM file.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, max_memory_bytes: int = DEFAULT_MEMORY_BYTES, max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                print(f"Warning: Could not create cache directory '{self.directory}': {e}. Using memory only.", file=sys.stderr)
+                self.directory = None
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        raw = f"{model}\0{voice}\0{_normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key: str, ext: str = ".pcm") -> str:
+        return os.path.join(self.directory, f"{key}{ext}")
+
+    def contains(self, text: str, voice: str, model: str) -> bool:
+        """True if the PCM is stored on disk; unlike `get`, neither counts as a lookup nor loads anything."""
+        return bool(self.directory) and os.path.exists(self._path(self.key(text, voice, model)))
+
+    def get_motion(self, text: str, voice: str, model: str) -> Optional[bytes]:
+        """The motion stored with a cached utterance, or None."""
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(self.key(text, voice, model), MOTION_EXT), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store_motion(self, text: str, voice: str, model: str, data: bytes) -> bool:
+        """Stores precomputed motion next to an utterance already on disk; False if there is none."""
+        key = self.key(text, voice, model)
+        if not self.directory or not os.path.exists(self._path(key)):
+            return False
+        path = self._path(key, MOTION_EXT)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return False
+        return True
+
+    def get(self, text: str, voice: str, model: str):
+        """Returns the cached PCM (bytes or a read-only mmap) or None on a miss."""
+        key = self.key(text, voice, model)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                metrics.CACHE_REQUESTS.inc("hit")
+                return data
+
+            if self.directory:
+                path = self._path(key)
+                try:
+                    with open(path, "rb") as f:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    os.utime(path)  # Mark as recently used for disk eviction
+                except (OSError, ValueError):
+                    mapped = None
+                if mapped is not None:
+                    self.hits += 1
+                    metrics.CACHE_REQUESTS.inc("hit")
+                    self._remember(key, mapped)
+                    return mapped
+
+            self.misses += 1
+            metrics.CACHE_REQUESTS.inc("miss")
+            return None
+
+    def record(self, text: str, voice: str, model: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Passes chunks through unchanged, storing the full utterance once the source is exhausted.
+
+        An empty response is never stored, so an upstream hiccup cannot leave a phrase silent for good.
+        """
+        key = self.key(text, voice, model)
+        tmp_path = None
+        f = None
+        if self.directory:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                f = open(tmp_path, "wb")
+            except OSError:
+                f = None
+
+        max_entry = self.max_memory_bytes // 4
+        kept = []
+        kept_bytes = 0
+        total = 0
+        complete = False
+        try:
+            for chunk in chunks:
+                total += len(chunk)
+                if f is not None:
+                    try:
+                        f.write(chunk)
+                    except OSError:
+                        f.close()
+                        f = None
+                        os.remove(tmp_path)
+                if kept is not None:
+                    kept.append(bytes(chunk))
+                    kept_bytes += len(chunk)
+                    if kept_bytes > max_entry:
+                        kept = None
+                yield chunk
+            complete = total > 0
+        finally:
+            if f is not None:
+                f.close()
+                if complete:
+                    os.replace(tmp_path, self._path(key))
+                    self._remove(self._path(key, MOTION_EXT))  # Computed from the audio just replaced
+                    self._evict_disk()
+                else:
+                    os.remove(tmp_path)
+            if complete and kept is not None:
+                with self._lock:
+                    self._remember(key, b"".join(kept))
+
+    def _remember(self, key: str, data) -> None:
+        """Inserts into the memory tier (caller holds the lock), evicting least recently used entries."""
+        size = len(data)
+        if size > self.max_memory_bytes // 4:
+            return
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        """Removes the least recently used files until the store fits in max_disk_bytes."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".pcm")]
+            stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_disk_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                self._remove(path[: -len(".pcm")] + MOTION_EXT)
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
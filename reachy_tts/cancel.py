@@ -0,0 +1,47 @@
+import threading
+from typing import Callable, List
+
+class CancelToken:
+    """Set once to stop an utterance early.
+
+    Threads poll `is_set()` between hops; callbacks registered with `add_callback` run in the
+    cancelling thread and wake up whatever is blocked (queues, barriers, start events).
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        return self._event.wait(timeout)
+
+    def cancel(self) -> bool:
+        """Cancels and runs the registered callbacks; False if it was already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        return True
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Runs `callback` on cancellation, or right away if already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
@@ -1,55 +1,320 @@
 import os
 import sys
+import signal
 import argparse
-from openai import OpenAI
-from reachy_mini import ReachyMini
-from reachy_mini.utils import create_head_pose
-import uvicorn
+import threading
+from urllib.parse import quote, urlencode
 
-from reachy_tts.core import _execute_tts_movement
-from reachy_tts.server import app
-import reachy_tts.server as server_module
+# Only light modules here: NumPy, the robot SDK and the web stack are imported once main() knows
+# the call is not just --help or a request forwarded to the resident daemon
+from reachy_tts import daemon
+from reachy_tts.cancel import CancelToken
+from reachy_tts.cache import DEFAULT_CACHE_DIR, DEFAULT_DISK_BYTES
+from reachy_tts.defaults import BACKEND_NAMES, TTS_FORMATS, DEFAULT_HEDGE_PERCENTILE, DEFAULT_DEADLINE_S, DEFAULT_RAW_SR, DEFAULT_IDLE_RETURN_S, DEFAULT_CONTROL_HZ, DEFAULT_SPEAKER
+from reachy_tts.jobs import DEFAULT_MAX_DEPTH
+from reachy_tts.robots import Robot, RobotPool, DEFAULT_ROBOT, parse_robot_spec, parse_group_spec
+
+def _connect_robots(args) -> RobotPool:
+    """Connects to every robot given with --robot (or the local one), moving each head to neutral."""
+    from reachy_mini import ReachyMini
+    from reachy_mini.utils import create_head_pose
+
+    specs = [parse_robot_spec(spec) for spec in args.robot] or [(DEFAULT_ROBOT, None, None)]
+    neutral_head_pose = create_head_pose(0, 0, 0, 0, 0, 0, degrees=True)
+    pool = RobotPool()
+    for name, host, speaker in specs:
+        if host:
+            reachy = ReachyMini(host=host, localhost_only=False, media_backend="default")
+        else:
+            reachy = ReachyMini(media_backend="default")
+        reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=0.5, body_yaw=0.0)
+        pool.add(Robot(name, reachy, speaker or args.speaker or DEFAULT_SPEAKER, host))
+    for spec in args.group:
+        pool.add_group(*parse_group_spec(spec))
+    return pool
+
+def _cancel_on_interrupt() -> CancelToken:
+    """First Ctrl-C stops the utterance and returns the head to neutral; a second one exits at once."""
+    cancel = CancelToken()
+
+    def _handler(signum, frame):
+        if cancel.is_set():
+            raise KeyboardInterrupt
+        # Cancel from another thread: the handler may have interrupted the main thread inside a queue call
+        threading.Thread(target=cancel.cancel, name="tts-cancel", daemon=True).start()
+
+    signal.signal(signal.SIGINT, _handler)
+    return cancel
+
+def _daemon_argv(args) -> list:
+    """The server options of this call, for a daemon started on its behalf."""
+    argv = ["--speaker", args.speaker or DEFAULT_SPEAKER, "--tts-format", args.tts_format, "--hedge-percentile", str(args.hedge_percentile), "--tts-deadline-ms", str(args.tts_deadline_ms), "--idle-return", str(args.idle_return), "--control-hz", str(args.control_hz),
+            "--max-queue", str(args.max_queue), "--cache-dir", args.cache_dir, "--cache-size-mb", str(args.cache_size_mb)]
+    for flag, value in (("--backend", args.backend), ("--tts-url", args.tts_url), ("--local-voice", args.local_voice), ("--failover-ms", args.failover_ms)):
+        if value is not None:
+            argv += [flag, str(value)]
+    for spec in args.robot:
+        argv += ["--robot", spec]
+    for spec in args.group:
+        argv += ["--group", spec]
+    for flag, enabled in (("--fast", args.fast), ("--keep-audio-warm", args.keep_audio_warm), ("--no-cache", args.no_cache)):
+        if enabled:
+            argv.append(flag)
+    return argv
+
+def _forward(args) -> int:
+    """Speaks through the resident daemon instead of this process; returns the exit status.
+
+    Ctrl-C cancels the utterance on the daemon, like it does in-process.
+    """
+    if args.play:
+        try:
+            f = sys.stdin.buffer if args.play == "-" else open(args.play, "rb")
+        except OSError as e:
+            print(f"Error: Could not read '{args.play}': {e}", file=sys.stderr)
+            return 1
+        query = {"rate": args.play_rate, "channels": args.play_channels, "wait": "true"}
+        for key, value in (("robot", args.target), ("speaker", args.speaker), ("volume", args.volume), ("fast", "true" if args.fast else None)):
+            if value is not None:
+                query[key] = value
+        try:
+            # The job id is only known once the upload is complete, so an interrupt stops the target robots
+            status, data = daemon.request(args.socket, "POST", f"/play?{urlencode(query)}", f)
+        except KeyboardInterrupt:
+            stop = f"?{urlencode({'robot': args.target})}" if args.target else ""
+            daemon.request(args.socket, "POST", f"/stop{stop}")
+            return 0
+        finally:
+            f.close()
+    else:
+        payload = {
+            "text": args.text, "voice": args.voice, "model": args.model, "speaker": args.speaker, "volume": args.volume,
+            "stream": args.stream, "segmented": args.segmented, "robot": args.target, "backend": args.backend,
+            "fast": True if args.fast else None,
+        }
+        status, data = daemon.request(args.socket, "POST", "/tts", payload)
+        if status == 202:
+            job_url = f"/tts/{quote(data['job_id'])}"
+            try:
+                status, data = daemon.request(args.socket, "GET", f"{job_url}?wait=true")
+            except KeyboardInterrupt:
+                daemon.request(args.socket, "DELETE", job_url)
+                return 0
+            if data.get("status") == "failed":
+                status, data = 500, {"detail": data.get("error")}
+    if status >= 400:
+        print(f"Error: {data.get('detail', data)}", file=sys.stderr)
+        return 1
+    return 0
+
+def _render_main(argv) -> int:
+    """`reachy-tts render PHRASES`: pre-renders the audio and motion of a script into the cache."""
+    parser = argparse.ArgumentParser(prog="reachy-tts render", description="Synthesize a list of phrases and precompute their head motion, so speaking them later needs no network and no analysis")
+    parser.add_argument("phrases", type=str, help="Text file with one phrase per line ('#' starts a comment; '-' for stdin)")
+    parser.add_argument("--voice", type=str, default="alloy", help="OpenAI voice the phrases will be spoken with (default: %(default)s)")
+    parser.add_argument("--model", type=str, default="tts-1", help="TTS model (default: %(default)s)")
+    parser.add_argument("--api-key", type=str, help="OpenAI API Key (fallback to OPENAI_API_KEY env var)")
+    parser.add_argument("--backend", type=str, choices=BACKEND_NAMES, default="openai", help="TTS backend the phrases will be spoken with (default: %(default)s)")
+    parser.add_argument("--tts-url", type=str, help="Speech endpoint of a local TTS server returning 24kHz PCM")
+    parser.add_argument("--local-voice", type=str, help="Voice name for the offline engine (macOS `say` or espeak-ng)")
+    parser.add_argument("--concurrency", type=int, help="Synthesis requests in flight at once (default: 8)")
+    parser.add_argument("--processes", type=int, help="Processes analysing motion (default: one per core)")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help=f"Directory of the on-disk audio cache to render into (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_DISK_BYTES // (1024 * 1024), help="Maximum size of the on-disk audio cache in MB (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    from reachy_tts.backends import create_backends
+    from reachy_tts.cache import PCMCache
+    from reachy_tts.render import read_phrases, render_phrases, RENDER_CONCURRENCY
+
+    api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
+    if not api_key and args.backend == "openai":
+        print("Error: OpenAI API key must be provided via --api-key argument or OPENAI_API_KEY environment variable.", file=sys.stderr)
+        return 1
+    if args.backend == "http" and not args.tts_url:
+        print("Error: --tts-url is required with --backend http.", file=sys.stderr)
+        return 1
+    try:
+        with (sys.stdin if args.phrases == "-" else open(args.phrases, encoding="utf-8")) as f:
+            phrases = read_phrases(f)
+    except OSError as e:
+        print(f"Error: Could not read '{args.phrases}': {e}", file=sys.stderr)
+        return 1
+    cache = PCMCache(args.cache_dir, max_disk_bytes=args.cache_size_mb * 1024 * 1024)
+    if not cache.directory:
+        print("Error: Rendering needs a writable --cache-dir.", file=sys.stderr)
+        return 1
+
+    backend = create_backends(api_key, args.tts_url, args.local_voice)[args.backend]
+    print(f"Rendering {len(phrases)} phrases with {backend.name} TTS, voice: {args.voice}, into {cache.directory}...")
+    stats = render_phrases(backend, phrases, args.voice, args.model, cache, args.concurrency or RENDER_CONCURRENCY, args.processes)
+    wall = stats["wall_s"]
+    print(f"Rendered {stats['rendered']} phrases ({stats['audio_s']:.1f} s of audio), {stats['skipped']} already rendered, {stats['failed']} failed.")
+    if wall > 0:
+        print(f"Throughput: {stats['rendered'] / wall:.2f} phrases/s, {stats['audio_s'] / wall:.1f}x real time ({wall:.1f} s).")
+    return 1 if stats["failed"] else 0
 
 def main():
-    parser = argparse.ArgumentParser(description="Reachy TTS CLI Tool")
+    if sys.argv[1:2] == ["render"]:
+        sys.exit(_render_main(sys.argv[2:]))
+    parser = argparse.ArgumentParser(description="Reachy TTS CLI Tool", epilog="Run 'reachy-tts render --help' to pre-render a list of phrases.")
     parser.add_argument("text", type=str, nargs="?", help="Text for Reachy to say (ignored if --http is used)")
     parser.add_argument("--voice", type=str, default="alloy", help="OpenAI voice (alloy, echo, fable, onyx, nova, shimmer) (default: alloy)")
     parser.add_argument("--model", type=str, default="tts-1", help="OpenAI TTS model (default: tts-1)")
     parser.add_argument("--api-key", type=str, help="OpenAI API Key (fallback to OPENAI_API_KEY env var)")
-    parser.add_argument("--speaker", type=str, default="reSpeaker XVF3800", help="Target speaker name (default: reSpeaker XVF3800)")
+    parser.add_argument("--backend", type=str, choices=BACKEND_NAMES, help="TTS backend: OpenAI, a local OpenAI-compatible HTTP server (--tts-url) or the offline engine (default: openai)")
+    parser.add_argument("--tts-url", type=str, help="Speech endpoint of a local TTS server returning 24kHz PCM, e.g. http://localhost:8880/v1/audio/speech")
+    parser.add_argument("--local-voice", type=str, help="Voice name for the offline engine (macOS `say` or espeak-ng)")
+    parser.add_argument("--failover-ms", type=float, help="Switch to the offline engine when a remote backend sends no audio within this many milliseconds")
+    parser.add_argument("--tts-format", type=str, choices=TTS_FORMATS, default="auto", help="Transfer format of remote TTS audio; 'auto' switches from raw PCM to opus when the measured bandwidth is too low (compressed formats need ffmpeg) (default: %(default)s)")
+    parser.add_argument("--hedge-percentile", type=float, default=DEFAULT_HEDGE_PERCENTILE, help="Send a duplicate remote TTS request once the first byte is later than this percentile of recent ones, and use whichever answers first; 0 disables (default: %(default)s)")
+    parser.add_argument("--tts-deadline-ms", type=float, default=DEFAULT_DEADLINE_S * 1000, help="Fail a remote TTS request (or fall back with --failover-ms) when no audio arrives for this many milliseconds; 0 disables (default: %(default)s)")
+    parser.add_argument("--speaker", type=str, help=f"Target speaker name; forwarded calls speak through it instead of each robot's own (default: {DEFAULT_SPEAKER})")
+    parser.add_argument("--robot", action="append", default=[], metavar="NAME=HOST[@SPEAKER]", help="Add a robot to the pool, optionally with its own speaker (repeatable; default: the local robot only)")
+    parser.add_argument("--group", action="append", default=[], metavar="NAME=ROBOT,ROBOT", help="Define a named group of robots that requests can target (repeatable)")
+    parser.add_argument("--target", type=str, help="Robot, group or 'all' to speak through (default: the first robot)")
+    parser.add_argument("--play", type=str, metavar="AUDIO", help="Speak an audio file (WAV, or raw 16-bit PCM; '-' for stdin) with head sway instead of synthesizing text")
+    parser.add_argument("--play-rate", type=int, default=DEFAULT_RAW_SR, help="Sample rate of raw PCM given to --play (default: %(default)s)")
+    parser.add_argument("--play-channels", type=int, default=1, help="Channel count of raw PCM given to --play (default: %(default)s)")
     parser.add_argument("--http", action="store_true", help="Start an HTTP server instead of running directly")
     parser.add_argument("--port", type=int, default=8000, help="Port for the HTTP server (default: 8000)")
     parser.add_argument("--ui", action="store_true", help="Expose a simple web UI in HTTP mode (at '/')")
-    parser.add_argument("--volume", type=int, help="Temporary system volume (0-100). Restored after speech.")
+    parser.add_argument("--daemon", action="store_true", help="Run the resident server on --socket; one-shot calls are then forwarded to it instead of starting up themselves")
+    parser.add_argument("--resident", action="store_true", help="Forward this call to the resident daemon, starting it in the background (with this call's server options) if it is not running")
+    parser.add_argument("--no-daemon", action="store_true", help="Speak from this process even if a resident daemon is running")
+    parser.add_argument("--stop-daemon", action="store_true", help="Shut down the resident daemon and exit")
+    parser.add_argument("--socket", type=str, default=daemon.DEFAULT_SOCKET, help="Unix socket of the resident daemon (default: %(default)s)")
+    parser.add_argument("--volume", type=int, help="Software volume of the utterance (0-100, 100 is unmodified audio); the system volume is untouched")
+    parser.add_argument("--stream", action="store_true", help="Start playback and motion as soon as the first audio chunks arrive")
+    parser.add_argument("--segmented", action="store_true", help="Synthesize sentences in parallel and play each one as soon as it is ready")
+    parser.add_argument("--fast", action="store_true", help="Skip the zeroing and neutral-return moves around each utterance; the head returns to neutral once idle")
+    parser.add_argument("--idle-return", type=float, default=DEFAULT_IDLE_RETURN_S, help="Fast mode: idle seconds before the head returns to neutral (default: %(default)s)")
+    parser.add_argument("--control-hz", type=float, default=DEFAULT_CONTROL_HZ, help="Rate of head targets sent to the robot, interpolated between 50 ms audio hops (default: %(default)s)")
+    parser.add_argument("--keep-audio-warm", action="store_true", help="Keep the output stream fed with silence between utterances so the device never idles down")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_DEPTH, help="Maximum number of pending TTS jobs in HTTP mode before answering 429 (default: %(default)s)")
+    parser.add_argument("--profile", type=str, metavar="TRACE_JSON", help="Record a Chrome/Perfetto trace of each utterance to this file (in HTTP mode, one file per job: <name>-<job id>.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the synthesized audio cache")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help=f"Directory of the on-disk audio cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_DISK_BYTES // (1024 * 1024), help="Maximum size of the on-disk audio cache in MB (default: %(default)s)")
     args = parser.parse_args()
 
+    if args.stop_daemon:
+        print("Daemon stopped." if daemon.stop(args.socket) else "No daemon is running.")
+        return
+    # Everything a one-shot call needs is already in the daemon: robot connection, clients, audio streams
+    if not (args.http or args.daemon or args.no_daemon or args.profile) and (args.text or args.play):
+        try:
+            if args.resident:
+                env = {**os.environ, "OPENAI_API_KEY": args.api_key} if args.api_key else None
+                daemon.start(_daemon_argv(args), args.socket, env)
+            if args.resident or daemon.is_running(args.socket):
+                sys.exit(_forward(args))
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    if args.daemon:
+        try:
+            daemon.prepare_socket(args.socket)
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    import uvicorn
+    from reachy_tts import trace
+    from reachy_tts.audio import AudioEngine
+    from reachy_tts.backends import create_backends
+    from reachy_tts.decode import decode_audio, iter_file
+    from reachy_tts.cache import PCMCache
+    from reachy_tts.core import _execute_tts_on_robots, OPENAI_SR
+    import reachy_tts.server as server_module
+
+    args.backend = args.backend or "openai"
     api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
-    if not api_key:
+    if not api_key and args.backend == "openai" and not (args.play and not (args.http or args.daemon)):
         print("Error: OpenAI API key must be provided via --api-key argument or OPENAI_API_KEY environment variable.", file=sys.stderr)
         sys.exit(1)
-        
-    client = OpenAI(api_key=api_key)
+    if args.backend == "http" and not args.tts_url:
+        print("Error: --tts-url is required with --backend http.", file=sys.stderr)
+        sys.exit(1)
+
+    failover_s = args.failover_ms / 1000.0 if args.failover_ms else None
+    backends = create_backends(api_key, args.tts_url, args.local_voice, failover_s, args.tts_format, args.hedge_percentile, args.tts_deadline_ms / 1000.0)
+    backend = backends.get(args.backend, backends["local"])  # Only --play runs without the chosen backend, and never synthesizes
+    cache = None if args.no_cache else PCMCache(args.cache_dir, max_disk_bytes=args.cache_size_mb * 1024 * 1024)
 
     try:
-        reachy = ReachyMini(media_backend="default")
-        neutral_head_pose = create_head_pose(0, 0, 0, 0, 0, 0, degrees=True)
-        reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=0.5, body_yaw=0.0)
+        pool = _connect_robots(args)
+        targets = pool.resolve(args.target)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
     except ConnectionError:
         print("\n❌ Error: Could not connect to the Reachy Mini daemon.", file=sys.stderr)
         print("Please ensure the daemon is running in the background and try again.\n", file=sys.stderr)
         sys.exit(1)
 
-    if args.http:
-        server_module._GLOBAL_REACHY = reachy
-        server_module._GLOBAL_OPENAI = client
-        server_module._GLOBAL_SPEAKER = args.speaker
+    # One audio engine for the whole process: the speaker's output stream is opened once and reused
+    engine = AudioEngine(OPENAI_SR, keep_warm=args.keep_audio_warm)
+    for speaker in dict.fromkeys(robot.speaker for robot in pool.robots.values()):
+        try:
+            engine.prepare(speaker)
+        except OSError as e:
+            print(f"Warning: Could not pre-open the output stream for '{speaker}': {e}", file=sys.stderr)
+
+    if args.http or args.daemon:
+        server_module._ROBOT_POOL = pool
+        server_module._GLOBAL_BACKEND = backend
+        server_module._GLOBAL_BACKENDS = backends
         server_module._UI_ENABLED = args.ui
-        print(f"Starting FastAPI server on port {args.port}...")
-        if args.ui:
-            print(f"UI exposed at http://localhost:{args.port}/")
-        uvicorn.run(app, host="0.0.0.0", port=args.port)
+        server_module._GLOBAL_CACHE = cache
+        server_module._MAX_QUEUE_DEPTH = args.max_queue
+        server_module._GLOBAL_AUDIO = engine
+        server_module._FAST_MODE = args.fast
+        server_module._IDLE_RETURN_S = args.idle_return
+        server_module._CONTROL_HZ = args.control_hz
+        server_module._PROFILE_PATH = args.profile
+        try:
+            if args.daemon:
+                sock = daemon.listen(args.socket)
+                # uvicorn re-raises SIGTERM once it has shut down; exit through the cleanup below instead of dying
+                signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+                try:
+                    print(f"Starting the resident daemon on {args.socket}...")
+                    uvicorn.run(server_module.app, fd=sock.fileno())
+                finally:
+                    daemon.cleanup_socket(args.socket)
+            else:
+                print(f"Starting FastAPI server on port {args.port}...")
+                if args.ui:
+                    print(f"UI exposed at http://localhost:{args.port}/")
+                uvicorn.run(server_module.app, host="0.0.0.0", port=args.port)
+        finally:
+            engine.close()
     else:
-        if not args.text:
-            print("Error: 'text' positional argument is required unless running in --http mode.", file=sys.stderr)
+        if not args.text and not args.play:
+            print("Error: 'text' positional argument (or --play) is required unless running in --http mode.", file=sys.stderr)
             sys.exit(1)
-        _execute_tts_movement(reachy, client, args.text, args.voice, args.model, args.speaker, args.volume)
+        audio = None
+        if args.play:
+            try:
+                f = sys.stdin.buffer if args.play == "-" else open(args.play, "rb")
+                audio = decode_audio(iter_file(f), args.play_rate, args.play_channels)
+            except (OSError, ValueError) as e:
+                print(f"Error: Could not read '{args.play}': {e}", file=sys.stderr)
+                sys.exit(1)
+        if args.profile:
+            trace.start()
+        cancel = _cancel_on_interrupt()
+        try:
+            if audio is not None:
+                _execute_tts_on_robots(targets, backend, args.play, args.voice, args.model, None, args.volume, engine=engine, fast=args.fast, idle_return_s=args.idle_return, control_hz=args.control_hz, cancel=cancel, audio=audio.chunks, sr=audio.sr)
+            else:
+                _execute_tts_on_robots(targets, backend, args.text, args.voice, args.model, None, args.volume, args.stream, cache, segmented=args.segmented, engine=engine, fast=args.fast, idle_return_s=args.idle_return, control_hz=args.control_hz, cancel=cancel)
+        finally:
+            engine.close()
+            if args.profile:
+                trace.stop().save(args.profile)
+                print(f"Trace written to {args.profile}")
+
+if __name__ == "__main__":
+    main()
@@ -1,141 +1,735 @@
 import sys
+import math
 import time
+import queue
 import threading
-from typing import Optional
-import pyaudio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 import numpy as np
 
 from reachy_mini.utils import create_head_pose
-from reachy_mini.utils.interpolation import compose_world_offset
 
 from reachy_tts.audio import (
-    _get_macos_volume, 
-    _set_macos_volume, 
-    _try_switch_audio_source, 
-    _restore_audio_source, 
-    play_audio_thread
+    AudioEngine,
+    GainStage,
+    fade_edges,
+    play_audio_queue_thread,
+    PlaybackClock
 )
-from reachy_tts.kinematics import SwayRollRT, HOP_MS
+from reachy_tts import metrics, trace
+from reachy_tts.backends import as_backend
+from reachy_tts.cache import iter_buffer
+from reachy_tts.cancel import CancelToken
+from reachy_tts.defaults import DEFAULT_CONTROL_HZ, DEFAULT_IDLE_RETURN_S
+from reachy_tts.segments import split_segments
+from reachy_tts.kinematics import SwayRollRT, sway_trajectory, head_poses, HOP_MS, POSE_KEYS
 
-def _execute_tts_movement(reachy, client, text: str, voice: str, model: str, speaker: Optional[str], volume: Optional[int] = None):
-    p = pyaudio.PyAudio()
+# OpenAI TTS-1 PCM streams natively at 24kHz, 16bit, mono
+OPENAI_SR = 24000
 
-    device_index = None
-    target_device_name = None
-    
-    if speaker:
-        for i in range(p.get_device_count()):
+# Audio held back before the first write so short network stalls don't starve the speaker
+JITTER_BUFFER_MS = 250
+# Upper bound on audio queued ahead of playback; keeps memory flat for long utterances
+MAX_BUFFERED_MS = 5000
+# Concurrent synthesis requests in segmented mode
+SEGMENT_WORKERS = 4
+# Poses are sent this much ahead of their audio to cover the robot's command-to-motion latency
+MOTION_LOOKAHEAD_MS = 40
+# A target sent later than this (but less than a control period late) counts as a late overrun
+LATE_TOLERANCE_MS = 10
+# Fast mode: hops over which motion is blended in from wherever the previous utterance left the head
+BLEND_HOPS = 6
+# Stored motion precision: float32 is far finer than the robot can position its head, at half the size
+MOTION_DTYPE = "<f4"
+# Fan-out: how long robots that are ready wait for the slowest one before starting on their own
+START_SYNC_TIMEOUT_S = 5.0
+
+# Per-robot fast-mode state: last sway offsets sent, and the pending deferred neutral return
+_idle_lock = threading.Lock()
+_idle_timers: Dict[int, threading.Timer] = {}
+_last_offsets: Dict[int, np.ndarray] = {}
+
+def _cache_model(backend_name: str, model: str) -> str:
+    """Cache namespace of a backend's audio; OpenAI keeps the bare model name so existing entries stay valid."""
+    return model if backend_name == "openai" else f"{backend_name}:{model}"
+
+def _until_cancelled(chunks: Iterable[bytes], cancel: Optional[CancelToken]) -> Iterator[bytes]:
+    """Passes chunks through until `cancel` is set, then closes the source so its request is abandoned."""
+    try:
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                break
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+def _join_until_cancelled(chunks: Iterable[bytes], cancel: Optional[CancelToken]) -> bytes:
+    """`b"".join(chunks)`, except that it returns b"" as soon as `cancel` is set, even while the source is blocked on the network.
+
+    The source is read on a helper thread, which closes it once its pending read returns.
+    """
+    if cancel is None:
+        return b"".join(chunks)
+    parts = []
+    errors = []
+    done = threading.Event()
+
+    def _read():
+        try:
+            for chunk in _until_cancelled(chunks, cancel):
+                parts.append(chunk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    threading.Thread(target=_read, name="tts-buffer", daemon=True).start()
+    cancel.add_callback(done.set)
+    try:
+        done.wait()
+    finally:
+        cancel.remove_callback(done.set)
+    if cancel.is_set():
+        return b""  # An aborted read may have failed; a cancelled utterance reports no error
+    if errors:
+        raise errors[0]
+    return b"".join(parts)
+
+def _synthesize_pcm(backend, text: str, voice: str, model: str, cache=None, chunk_size: int = 4096, cancel: Optional[CancelToken] = None) -> Iterator[bytes]:
+    """Yields raw PCM chunks from the TTS backend as soon as they arrive, recording them into the cache when one is given.
+
+    Setting `cancel` aborts the request, even one still waiting for its first byte.
+    """
+    start = time.perf_counter()
+    synthesis = backend.open(text, voice, model, chunk_size)
+    chunks = synthesis.chunks
+    if cache is not None:
+        # Stored under the backend that actually answered, so fallback audio never shadows the primary voice
+        chunks = cache.record(text, voice, _cache_model(synthesis.backend, model), chunks)
+    abort = synthesis.abort if cancel is not None else None
+    if abort is not None:
+        cancel.add_callback(abort)
+    try:
+        first = True
+        for chunk in chunks:
+            if first:
+                metrics.TTS_TTFB.observe(time.perf_counter() - start)
+                trace.complete("tts.request", start, chars=len(text), backend=synthesis.backend)
+                first = False
+            trace.instant("tts.chunk", bytes=len(chunk))
+            yield chunk
+    finally:
+        if abort is not None:
+            cancel.remove_callback(abort)
+    metrics.TTS_SYNTHESIS.observe(time.perf_counter() - start)
+    trace.complete("tts.synthesis", start, chars=len(text), backend=synthesis.backend)
+
+def _prefetch_pcm(backend, text: str, voice: str, model: str, cache=None, cancel: Optional[CancelToken] = None):
+    """Synthesizes a whole utterance ahead of time, going through the cache when one is given.
+
+    Returns b"" as soon as `cancel` is set.
+    """
+    backend = as_backend(backend)
+    if cache is not None:
+        pcm = cache.get(text, voice, _cache_model(backend.name, model))
+        if pcm is not None:
+            return pcm
+    return _join_until_cancelled(_synthesize_pcm(backend, text, voice, model, cache, cancel=cancel), cancel)
+
+def _synthesize_segments(backend, segments: Iterable[str], voice: str, model: str, cache=None, max_workers: int = SEGMENT_WORKERS, cancel: Optional[CancelToken] = None) -> Iterator[bytes]:
+    """Synthesizes segments concurrently and yields their PCM in order, each as soon as it (and its predecessors) are ready.
+
+    `segments` may be lazy (sentences of a reply that is still being written): each one is submitted
+    as soon as it arrives. At most `max_workers` segments are in flight or waiting to be played, so
+    memory stays bounded. Each segment goes through the cache on its own, so repeated sentences are
+    reused across utterances.
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-segment")
+    pending: queue.Queue = queue.Queue()  # Futures in order, then None (or the error raised by `segments`)
+    slots = threading.Semaphore(max_workers)
+    closed = threading.Event()
+
+    def _submit():
+        try:
+            for segment in segments:
+                slots.acquire()
+                if closed.is_set():
+                    break
+                pending.put(pool.submit(_prefetch_pcm, backend, segment, voice, model, cache, cancel))
+        except Exception as e:
+            pending.put(e)
+        finally:
+            pending.put(None)
+            pool.shutdown(wait=False, cancel_futures=closed.is_set())
+
+    threading.Thread(target=_submit, name="tts-segments", daemon=True).start()
+    try:
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            pcm = item.result()
+            slots.release()
+            yield fade_edges(pcm, OPENAI_SR)
+    finally:
+        closed.set()
+        slots.release()  # Wake the submitter if it is waiting for a free slot
+
+def _iter_pcm_hops(chunks: Iterable[bytes], frames_per_hop: int) -> Iterator[bytes]:
+    """Re-slices arbitrary int16 byte chunks into hop-sized blocks (the last one may be shorter)."""
+    hop_bytes = frames_per_hop * 2
+    buf = bytearray()
+    spent = 0.0  # Time spent here, excluding waits for the source and the consumer
+    for chunk in chunks:
+        start = time.perf_counter()
+        buf.extend(chunk)
+        while len(buf) >= hop_bytes:
+            hop = bytes(buf[:hop_bytes])
+            del buf[:hop_bytes]
+            spent += time.perf_counter() - start
+            yield hop
+            start = time.perf_counter()
+        spent += time.perf_counter() - start
+    tail = len(buf) - (len(buf) % 2)
+    if tail:
+        yield bytes(buf[:tail])
+    metrics.DECODE.observe(spent)
+
+def _output_latency(stream) -> float:
+    try:
+        return float(stream.get_output_latency())
+    except Exception:
+        return 0.0
+
+def _cancel_neutral_return(reachy):
+    """Drops a pending deferred neutral return, or waits out one already moving the head."""
+    with _idle_lock:
+        timer = _idle_timers.pop(id(reachy), None)
+    if timer is not None:
+        timer.cancel()
+        timer.join()
+
+def _defer_neutral_return(reachy, neutral_head_pose, delay: float):
+    """Returns the head to neutral once no new utterance has started for `delay` seconds."""
+    def _return():
+        with _idle_lock:
+            if _idle_timers.get(id(reachy)) is not timer:
+                return
+            # The timer stays registered while it moves, so the next utterance joins it before sending poses
+            _last_offsets.pop(id(reachy), None)
+        try:
+            print("Idle: returning to neutral...")
+            with trace.span("motion.neutral_return", deferred=True):
+                reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=1.0, body_yaw=0.0)
+        finally:
+            with _idle_lock:
+                if _idle_timers.get(id(reachy)) is timer:
+                    del _idle_timers[id(reachy)]
+
+    timer = threading.Timer(delay, _return)
+    with _idle_lock:
+        previous = _idle_timers.get(id(reachy))
+        _idle_timers[id(reachy)] = timer
+        timer.start()  # Started while registered, so `_cancel_neutral_return` never joins an unstarted timer
+    if previous is not None:
+        previous.cancel()
+
+def _trajectory_of(pcm, sr: int = OPENAI_SR) -> np.ndarray:
+    """Sway poses of a whole utterance, one row of `POSE_KEYS` per hop, from a single vectorized pass."""
+    with trace.span("motion.trajectory"):
+        poses = sway_trajectory(np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2), sr)
+        return np.column_stack([poses[k] for k in POSE_KEYS])
+
+def _trajectory_bytes(pcm, sr: int = OPENAI_SR) -> bytes:
+    """`_trajectory_of` in its stored form: little-endian float32 rows of `POSE_KEYS`."""
+    return _trajectory_of(pcm, sr).astype(MOTION_DTYPE).tobytes()
+
+def _cached_trajectory(cache, backend_name: str, text: str, voice: str, model: str) -> Optional[np.ndarray]:
+    """Motion rendered ahead of time for a cached utterance (see `reachy-tts render`), or None."""
+    data = cache.get_motion(text, voice, _cache_model(backend_name, model)) if cache is not None else None
+    row_bytes = np.dtype(MOTION_DTYPE).itemsize * len(POSE_KEYS)
+    if not data or len(data) % row_bytes:
+        return None
+    trace.instant("motion.cached", bytes=len(data))
+    return np.frombuffer(data, dtype=MOTION_DTYPE).reshape(-1, len(POSE_KEYS)).astype(np.float64)
+
+class _StartGate:
+    """Waits for this robot's head to be in place, then for every other robot of a fan-out to get there too."""
+
+    def __init__(self, ready: threading.Event, barrier: threading.Barrier):
+        self.ready = ready
+        self.barrier = barrier
+
+    def wait(self):
+        self.ready.wait()
+        try:
+            with trace.span("playback.sync"):
+                self.barrier.wait(START_SYNC_TIMEOUT_S)
+        except threading.BrokenBarrierError:
+            pass  # A robot failed or is stuck; the others start anyway
+
+class _PoseMailbox:
+    """Single-slot handoff of the newest head target: a target not yet taken is replaced, never queued behind."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item) -> bool:
+        """Publishes `item` over any unsent one; False once the mailbox is closed."""
+        with self._cond:
+            if self._closed:
+                return False
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+            return True
+
+    def get(self):
+        """Blocks for the next item; None once the mailbox is closed and empty."""
+        with self._cond:
+            while self._item is None and not self._closed:
+                self._cond.wait()
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+def _play_pcm_with_motion(reachy, stream, chunks: Iterable[bytes], sr: int, neutral_head_pose, trajectory=None, start_pose=None, start_after: Optional[threading.Event] = None, control_hz: float = DEFAULT_CONTROL_HZ, cancel: Optional[CancelToken] = None, on_start: Optional[Callable[[], None]] = None, gain: Optional[GainStage] = None):
+    """Plays PCM chunks on an open output stream while driving head sway from the same audio, starting as soon as the first chunks arrive.
+
+    When the whole utterance is known up front, `trajectory` holds its precomputed poses (one row of
+    `POSE_KEYS` per hop) and the loop only indexes into it instead of analysing each hop.
+    `start_pose` (sway offsets the head currently holds) is blended out over the first BLEND_HOPS,
+    and `start_after` holds playback back (while audio keeps downloading) until the head is in place.
+    Poses are produced once per hop; a scheduling thread interpolates between them at `control_hz`
+    and hands each target to a sender thread through a single-slot mailbox, so a slow `set_target`
+    round trip drops stale targets instead of delaying the schedule or building a backlog.
+    Setting `cancel` stops audio and motion at the next hop and abandons the rest of the synthesis.
+    `on_start` is called from the playback thread as the first audio is written. `gain` scales
+    only what is played: the sway analysis sees the unscaled audio, so motion is the same at any volume.
+    Returns motion scheduling counters (hops, sent, late, skipped, dropped, underruns), the last offsets sent
+    and whether the utterance was cancelled.
+    """
+    frames_per_hop = int(sr * (HOP_MS / 1000.0))
+    frames_per_tick = sr / control_hz
+    prebuffer_hops = max(1, int(JITTER_BUFFER_MS / HOP_MS))
+    max_hops = max(prebuffer_hops + 1, int(MAX_BUFFERED_MS / HOP_MS))
+
+    playback_q: queue.Queue = queue.Queue(maxsize=max_hops)
+    motion_q: queue.Queue = queue.Queue(maxsize=max_hops)
+    pose_q: queue.Queue = queue.Queue()  # One pose row (or None) per hop; tiny, so unbounded
+    targets = _PoseMailbox()  # (hop, offsets, head) of the newest target not yet sent
+    clock = PlaybackClock(sr, _output_latency(stream), on_start)
+    fetch_errors = []
+    playback_errors = []
+    sender_errors = []
+    stats = {"hops": 0, "sent": 0, "late": 0, "skipped": 0, "dropped": 0, "underruns": 0, "last_pose": None, "first_write_at": None, "cancelled": False}
+    end = object()
+    late = object()
+
+    def _cancelled() -> bool:
+        return cancel is not None and cancel.is_set()
+
+    def _on_cancel():
+        # Runs in the cancelling thread: drop queued audio and wake every thread blocked on a queue or the clock
+        for q in (playback_q, motion_q):
             try:
-                info = p.get_device_info_by_index(i)
-                if info.get("maxOutputChannels", 0) > 0 and speaker.lower() in info.get("name", "").lower():
-                    device_index = i
-                    target_device_name = info.get("name")
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+            q.put_nowait(None)
+        clock.close()
+
+    def _fetch():
+        source = _until_cancelled(chunks, cancel)
+        try:
+            for hop in _iter_pcm_hops(source, frames_per_hop):
+                if _cancelled():
                     break
-            except Exception:
+                playback_q.put(hop)
+                motion_q.put(hop)
+        except Exception as e:
+            if not _cancelled():  # An aborted request fails; that is not an error of the utterance
+                fetch_errors.append(e)
+        finally:
+            source.close()
+            playback_q.put(None)
+            motion_q.put(None)
+
+    def _playback():
+        try:
+            if start_after is not None:
+                start_after.wait()
+            play_audio_queue_thread(stream, playback_q, prebuffer_hops, clock, cancel, gain)
+        except Exception as e:
+            playback_errors.append(e)
+            # Keep draining so the fetch thread never blocks on a full queue
+            while playback_q.get() is not None:
                 pass
 
-    original_device = None
-    original_volume = None
+    def _send():
+        # Each target is scheduled against the playback clock (the time its audio is actually heard,
+        # minus a lookahead for the robot's own latency) rather than wall-clock sleeps.
+        lookahead_s = MOTION_LOOKAHEAD_MS / 1000.0
+        tick_s = 1.0 / control_hz
+        previous = None
+        current = pose_q.get()
+        upcoming = late
+        hop_index = 0
+        while current is not end:
+            frame = hop_index * frames_per_hop
+            if current is not None and clock.wait_written(frame):
+                if upcoming is late:
+                    # Wait for the next hop's pose until this hop is due, then extrapolate without it
+                    timeout = clock.time_of_frame(frame) - lookahead_s - time.monotonic()
+                    try:
+                        upcoming = pose_q.get(timeout=max(0.0, timeout))
+                    except queue.Empty:
+                        pass
+                if upcoming is late:
+                    target = current if previous is None else 2.0 * current - previous
+                elif upcoming is end or upcoming is None:
+                    target = current
+                else:
+                    target = upcoming
+
+                # All ticks falling inside this hop, interpolated and turned into head poses in one batch
+                ticks = np.arange(math.ceil(frame / frames_per_tick), math.ceil((frame + frames_per_hop) / frames_per_tick))
+                tick_frames = ticks * frames_per_tick
+                offsets = current + ((tick_frames - frame) / frames_per_hop)[:, None] * (target - current)
+                heads = head_poses(offsets, neutral_head_pose)
+
+                for tick_frame, offset, head in zip(tick_frames, offsets, heads):
+                    if _cancelled():
+                        break
+                    delay = clock.time_of_frame(tick_frame) - lookahead_s - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif -delay > tick_s:
+                        # More than a tick behind: drop this target and catch up with the next one
+                        stats["skipped"] += 1
+                        trace.instant("motion.skipped", hop=hop_index, late_ms=-delay * 1000.0)
+                        continue
+                    elif -delay > LATE_TOLERANCE_MS / 1000.0:
+                        stats["late"] += 1
+
+                    if not targets.put((hop_index, offset, head)):
+                        return  # The sender failed
+
+            previous = current
+            current = pose_q.get() if upcoming is late else upcoming
+            upcoming = late
+            hop_index += 1
+
+    def _scheduler():
+        try:
+            _send()
+        except Exception as e:
+            sender_errors.append(e)
+        finally:
+            targets.close()
 
+    def _sender():
+        # Only this thread talks to the robot; the scheduler never waits on a round trip
+        try:
+            while True:
+                item = targets.get()
+                if item is None or _cancelled():
+                    break
+                hop, offset, head = item
+                send_start = time.perf_counter()
+                reachy.set_target(head=head, antennas=[0.0, 0.0], body_yaw=0.0)
+                metrics.SET_TARGET.observe(time.perf_counter() - send_start)
+                trace.complete("motion.set_target", send_start, hop=hop)
+                stats["sent"] += 1
+                stats["last_pose"] = offset
+        except Exception as e:
+            sender_errors.append(e)
+        finally:
+            targets.close()
+
+    fetch_thr = threading.Thread(target=_fetch, name="tts-fetch", daemon=True)
+    playback_thr = threading.Thread(target=_playback, name="tts-playback")
+    scheduler_thr = threading.Thread(target=_scheduler, name="tts-motion")
+    sender_thr = threading.Thread(target=_sender, name="tts-motion-send")
+    fetch_thr.start()
+    playback_thr.start()
+    scheduler_thr.start()
+    sender_thr.start()
+    if cancel is not None:
+        cancel.add_callback(_on_cancel)
+
+    # Pose analysis: one pose per hop, handed to the sender as soon as the hop's audio arrives
+    sway = SwayRollRT()
+    n_poses = len(trajectory) if trajectory is not None else 0
+    hop_index = 0
+    try:
+        while True:
+            hop = motion_q.get()
+            if hop is None or _cancelled():
+                break
+            hop_start = time.perf_counter()
+            if trajectory is not None:
+                pose = trajectory[hop_index] if hop_index < n_poses else None
+            else:
+                n = sway.process(np.frombuffer(hop, dtype=np.int16), sr)
+                metrics.SWAY_FEED.observe(time.perf_counter() - hop_start)
+                pose = sway.poses[n - 1].copy() if n else None  # Take latest smoothed interpolation interval
+            hop_index += 1
+            stats["hops"] += 1
+
+            if pose is not None and start_pose is not None and hop_index <= BLEND_HOPS:
+                pose = start_pose + (hop_index / BLEND_HOPS) * (pose - start_pose)
+            pose_q.put(pose)
+            trace.complete("motion.hop", hop_start, hop=hop_index - 1)
+    finally:
+        pose_q.put(end)
+
+    # Cleanup safely; the stream itself stays open and is owned by the audio engine
+    with trace.span("playback.join"):
+        scheduler_thr.join()
+        sender_thr.join()
+        playback_thr.join()
+    if cancel is not None:
+        cancel.remove_callback(_on_cancel)
+    stats["cancelled"] = _cancelled()
+    stats["dropped"] = targets.dropped
+    stats["underruns"] = clock.underruns
+    stats["first_write_at"] = clock.first_write_at
+    metrics.OVERRUNS.inc("late", amount=stats["late"])
+    metrics.OVERRUNS.inc("skipped", amount=stats["skipped"])
+    metrics.OVERRUNS.inc("dropped", amount=stats["dropped"])
+    metrics.UNDERRUNS.inc(amount=stats["underruns"])
+
+    if sender_errors:
+        raise sender_errors[0]
+    if playback_errors:
+        raise playback_errors[0]
+    if fetch_errors:
+        raise fetch_errors[0]
+
+    if stats["late"] or stats["skipped"] or stats["dropped"]:
+        print(
+            f"Warning: motion overruns: {stats['late']} late, {stats['skipped']} skipped and {stats['dropped']} dropped poses "
+            f"out of {stats['hops']} hops ({stats['underruns']} audio underruns).",
+            file=sys.stderr
+        )
+    return stats
+
+def _execute_tts_movement(reachy, backend, text: str, voice: str, model: str, speaker: Optional[str], volume: Optional[int] = None, stream: bool = False, cache=None, pcm=None, segmented: bool = False, engine: Optional[AudioEngine] = None, fast: bool = False, idle_return_s: float = DEFAULT_IDLE_RETURN_S, control_hz: float = DEFAULT_CONTROL_HZ, trajectory=None, start_barrier: Optional[threading.Barrier] = None, cancel: Optional[CancelToken] = None, segment_source: Optional[Iterable[str]] = None, on_start: Optional[Callable[[], None]] = None, audio: Optional[Iterable[bytes]] = None, sr: int = OPENAI_SR):
+    """Speaks `text` on one robot. A precomputed `trajectory` (for `pcm`) skips the motion analysis, and
+    `start_barrier` holds playback until every robot sharing it is ready, so a fan-out starts in sync.
+    Setting `cancel` stops the utterance within a hop and sends the head straight back to neutral.
+    `segment_source` streams the text in as segments while it is being written (`text` is then only
+    used for logging); they are synthesized and played back-to-back as one continuous utterance.
+    `audio` replaces synthesis with external mono int16 PCM chunks at `sr` (the rate of `pcm` too),
+    played and swayed to as they arrive."""
+    backend = as_backend(backend)
+    # One-shot callers get a throwaway engine; long-running processes pass their shared one
+    owns_engine = engine is None
+    if owns_engine:
+        engine = AudioEngine(OPENAI_SR)
+
+    device_index, target_device_name = engine.find_device(speaker)
     if volume is not None:
-        if target_device_name:
-            original_device = _try_switch_audio_source(target_device_name)
-        
-        original_volume = _get_macos_volume()
-        target_display = target_device_name if target_device_name else "default system speaker"
-        print(f"Temporarily setting volume of '{target_display}' to {volume}% (original: {original_volume}%)...")
-        _set_macos_volume(volume)
+        print(f"Volume: {volume}%")
 
+    started_at = time.monotonic()
+    utterance_start = time.perf_counter()
+    # The zeroing move runs alongside synthesis; playback waits for it. Fast mode skips it and
+    # blends from wherever the previous utterance left the head instead.
+    repositioned = threading.Event()
     try:
         neutral_head_pose = create_head_pose(0, 0, 0, 0, 0, 0, degrees=True)
-        
-        print("Zeroing position...")
-        reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=1.0, body_yaw=0.0)
-        time.sleep(1.0)
-        
-        print(f"Generating OpenAI TTS for voice: {voice}...")
-        audio_response = client.audio.speech.create(
-            model=model,
-            voice=voice,
-            input=text,
-            response_format="pcm"
-        )
 
-        # Decode and buffer full audio 
-        # (OpenAI TTS-1 PCM streams natively at 24kHz, 16bit, mono)
-        OPENAI_SR = 24000
-        pcm_bytes = b"".join([chunk for chunk in audio_response.iter_bytes(chunk_size=4096)])
-        pcm_array = np.frombuffer(pcm_bytes, dtype=np.int16)
+        reposition_errors = []
+        _cancel_neutral_return(reachy)
+        with _idle_lock:
+            start_pose = _last_offsets.pop(id(reachy), None)
+        if fast:
+            repositioned.set()
+        else:
+            start_pose = None  # The head is zeroed first; a stale offset from a fast utterance must not be blended out of
+            def _zero():
+                try:
+                    with trace.span("motion.zeroing"):
+                        reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=1.0, body_yaw=0.0)
+                        time.sleep(1.0)
+                except Exception as e:
+                    reposition_errors.append(e)
+                finally:
+                    repositioned.set()
+
+            print("Zeroing position...")
+            threading.Thread(target=_zero, name="tts-zeroing", daemon=True).start()
+        if cancel is not None:
+            # A cancelled utterance must not keep playback waiting for the zeroing move
+            cancel.add_callback(repositioned.set)
+
+        external = audio is not None or sr != OPENAI_SR
+        if pcm is None and cache is not None and segment_source is None and not external:
+            pcm = cache.get(text, voice, _cache_model(backend.name, model))
+        segments = split_segments(text) if segmented and pcm is None and not external else []
+        if pcm is not None:
+            trace.instant("tts.cached", bytes=len(pcm))
+            print(f"Playing audio at {sr} Hz..." if external else f"Using pre-synthesized TTS audio for voice: {voice}...")
+        elif audio is not None:
+            print(f"Playing streamed audio at {sr} Hz...")
+            chunks = audio
+        elif segment_source is not None:
+            # Incremental text: each segment is synthesized as soon as it is complete
+            print(f"Generating {backend.name} TTS for voice: {voice} (streamed text)...")
+            chunks = _synthesize_segments(backend, segment_source, voice, model, cache, cancel=cancel)
+        elif len(segments) > 1:
+            # Segmented mode: sentences are synthesized in parallel and played back-to-back as they are ready
+            print(f"Generating {backend.name} TTS for voice: {voice} ({len(segments)} segments)...")
+            chunks = _synthesize_segments(backend, segments, voice, model, cache, cancel=cancel)
+        else:
+            print(f"Generating {backend.name} TTS for voice: {voice}...")
+            chunks = _synthesize_pcm(backend, text, voice, model, cache, cancel=cancel)
+            if not stream:
+                # Buffered mode: wait for the full utterance before playing anything
+                with trace.span("tts.buffer"):
+                    pcm = _join_until_cancelled(chunks, cancel)
+
+        if pcm is not None:
+            # Whole utterance known: analyse it in one vectorized pass instead of per hop
+            chunks = iter_buffer(pcm)
+            if trajectory is None and not external and segment_source is None:
+                trajectory = _cached_trajectory(cache, backend.name, text, voice, model)
+            if trajectory is None:
+                trajectory = _trajectory_of(pcm, sr)
+        else:
+            trajectory = None
 
-        # Initialize PyAudio
         if device_index is not None:
-            print(f"Playing audio through speaker: {p.get_device_info_by_index(device_index)['name']}")
+            print(f"Playing audio through speaker: {target_device_name}")
         else:
             if speaker:
                 print(f"Warning: Could not find a speaker matching '{speaker}'. Falling back to system default.", file=sys.stderr)
 
-        stream_kwargs = {
-            "format": pyaudio.paInt16,
-            "channels": 1,
-            "rate": OPENAI_SR,
-            "output": True
-        }
-        if device_index is not None:
-            stream_kwargs["output_device_index"] = device_index
+        print(f"Speaking: '{text.strip()}'")
+        metrics.SPEAKING.inc()
+        try:
+            with engine.output(device_index, sr) as out_stream:
+                stats = _play_pcm_with_motion(
+                    reachy, out_stream, chunks, sr, neutral_head_pose, trajectory,
+                    start_pose=start_pose, control_hz=control_hz, cancel=cancel, on_start=on_start,
+                    gain=GainStage(volume, sr) if volume is not None else None,
+                    start_after=repositioned if start_barrier is None else _StartGate(repositioned, start_barrier)
+                )
+        finally:
+            metrics.SPEAKING.dec()
+        if stats["first_write_at"] is not None:
+            metrics.FIRST_SOUND.observe(stats["first_write_at"] - started_at)
+        if reposition_errors:
+            raise reposition_errors[0]
 
-        stream = p.open(**stream_kwargs)
+        if stats["cancelled"]:
+            # Barge-in: go back to neutral right away, whatever the mode
+            metrics.CANCELLATIONS.inc()
+            print("Cancelled: returning to neutral...")
+            with trace.span("motion.neutral_return", cancelled=True):
+                reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=1.0, body_yaw=0.0)
+        elif fast:
+            if stats["last_pose"] is not None:
+                with _idle_lock:
+                    _last_offsets[id(reachy)] = stats["last_pose"]
+            _defer_neutral_return(reachy, neutral_head_pose, idle_return_s)
+        else:
+            print("Returning to neutral...")
+            with trace.span("motion.neutral_return"):
+                reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=1.0, body_yaw=0.0)
+        return stats
+    finally:
+        trace.complete("utterance", utterance_start, chars=len(text), stream=stream, segmented=segmented, fast=fast)
+        if cancel is not None:
+            cancel.remove_callback(repositioned.set)
+        if owns_engine:
+            engine.close()
 
-        # Start audio background thread while the main thread updates robotic movements
-        playback_thr = threading.Thread(target=play_audio_thread, args=(stream, pcm_bytes))
-        playback_thr.start()
+def _execute_tts_on_robots(robots, backend, text: str, voice: str, model: str, speaker: Optional[str] = None, volume: Optional[int] = None, stream: bool = False, cache=None, pcm=None, segmented: bool = False, engine: Optional[AudioEngine] = None, fast: bool = False, idle_return_s: float = DEFAULT_IDLE_RETURN_S, control_hz: float = DEFAULT_CONTROL_HZ, cancel: Optional[CancelToken] = None, segment_source: Optional[Iterable[str]] = None, on_start: Optional[Callable[[], None]] = None, audio: Optional[Iterable[bytes]] = None, sr: int = OPENAI_SR):
+    """Speaks one utterance on several robots of a `RobotPool` at once.
 
-        # Reachy movement control loop
-        sway = SwayRollRT()
-        
-        # 50ms chunks aligned exactly with the hop interval (50ms @ 24kHz = 1200 frames)
-        frames_per_hop = int(OPENAI_SR * (HOP_MS / 1000.0)) 
-        
-        print(f"Speaking: '{text.strip()}'")
-        for i in range(0, len(pcm_array), frames_per_hop):
-            loop_start = time.time()
-            
-            chunk = pcm_array[i : i + frames_per_hop]
-            results = sway.feed(chunk, OPENAI_SR)
-            
-            if results:
-                r = results[-1]  # Take latest smoothed interpolation interval
-                
-                # Format movement offsets exactly simulating reachy_mini_conversation_app secondary poses
-                secondary_head_pose = create_head_pose(
-                    x=r["x_mm"] / 1000.0, 
-                    y=r["y_mm"] / 1000.0, 
-                    z=r["z_mm"] / 1000.0,
-                    roll=r["roll_rad"],
-                    pitch=r["pitch_rad"],
-                    yaw=r["yaw_rad"],
-                    degrees=False, mm=False
+    The audio is synthesized and analysed once and shared; each robot then zeroes, plays and sways
+    on its own thread, and playback starts together once all of them are in place. Each robot's
+    lock is held for the whole utterance, so utterances on disjoint robots run in parallel.
+    A fan-out waits for the whole of a `segment_source` or `audio` stream before it starts.
+    Returns the motion stats of each robot, in order.
+    """
+    robots = sorted(robots, key=lambda r: r.name)  # Fixed lock order, so overlapping fan-outs cannot deadlock
+    for robot in robots:
+        robot.lock.acquire()
+    try:
+        if len(robots) == 1:
+            robot = robots[0]
+            return [_execute_tts_movement(
+                robot.reachy, backend, text, voice, model, speaker or robot.speaker, volume, stream,
+                cache, pcm, segmented, engine, fast, idle_return_s, control_hz, cancel=cancel,
+                segment_source=segment_source, on_start=on_start, audio=audio, sr=sr
+            )]
+
+        backend = as_backend(backend)
+        if pcm is None and audio is not None:
+            pcm = _join_until_cancelled(audio, cancel)
+        elif pcm is None:
+            print(f"Generating {backend.name} TTS for {len(robots)} robots, voice: {voice}...")
+            if segment_source is not None or segmented:
+                parts = split_segments(text) if segment_source is None else segment_source
+                pcm = _join_until_cancelled(_synthesize_segments(backend, parts, voice, model, cache, cancel=cancel), cancel)
+            else:
+                pcm = _prefetch_pcm(backend, text, voice, model, cache, cancel)
+        if cancel is not None and cancel.is_set():
+            return []
+        trajectory = None
+        if audio is None and segment_source is None and not segmented:  # Segments joined here are not the cached utterance
+            trajectory = _cached_trajectory(cache, backend.name, text, voice, model)
+        if trajectory is None:
+            trajectory = _trajectory_of(pcm, sr)
+        barrier = threading.Barrier(len(robots))
+        if cancel is not None:
+            cancel.add_callback(barrier.abort)
+
+        def _speak(robot):
+            try:
+                return _execute_tts_movement(
+                    robot.reachy, backend, text, voice, model, speaker or robot.speaker, volume, False,
+                    None, pcm, False, engine, fast, idle_return_s, control_hz,
+                    trajectory=trajectory, start_barrier=barrier, cancel=cancel,
+                    on_start=on_start if robot is robots[0] else None, sr=sr
                 )
-                
-                # Merge with neutral head position and fire update
-                combined_head = compose_world_offset(neutral_head_pose, secondary_head_pose)
-                reachy.set_target(head=combined_head, antennas=[0.0, 0.0], body_yaw=0.0)
-            
-            # Compensate loop sleep interval (aiming to match Hop precisely)
-            elapsed = time.time() - loop_start
-            sleep_time = max(0.0, (HOP_MS / 1000.0) - elapsed)
-            time.sleep(sleep_time)
-
-        # Cleanup safely
-        playback_thr.join()
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+            except Exception:
+                barrier.abort()  # Don't keep the other robots waiting for one that will never start
+                raise
 
-        print("Returning to neutral...")
-        reachy.goto_target(head=neutral_head_pose, antennas=[0.0, 0.0], duration=1.0, body_yaw=0.0)
+        try:
+            with ThreadPoolExecutor(max_workers=len(robots), thread_name_prefix="tts-robot") as pool:
+                futures = [pool.submit(_speak, robot) for robot in robots]
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(barrier.abort)
+        errors = []
+        for robot, future in zip(robots, futures):
+            error = future.exception()
+            if error is not None:
+                print(f"Error on robot '{robot.name}': {error}", file=sys.stderr)
+                errors.append(error)
+        if errors:
+            raise errors[0]
+        return [f.result() for f in futures]
     finally:
-        if original_volume is not None:
-            print(f"Restoring volume to {original_volume}%...")
-            _set_macos_volume(original_volume)
-        if original_device is not None:
-            _restore_audio_source(original_device)
+        for robot in robots:
+            robot.lock.release()
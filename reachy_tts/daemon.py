@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import signal
+import socket
+import subprocess
+import http.client
+from typing import Any, Dict, List, Optional, Tuple
+
+# Only the standard library: this module is all a forwarded one-shot call imports
+
+# Per-user directory (mode 0700) holding the socket, pid file and log of the resident process
+DAEMON_DIR = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".cache"), "reachy-tts")
+DEFAULT_SOCKET = os.path.join(DAEMON_DIR, "daemon.sock")
+# Robot connection and imports of a freshly started daemon must complete within this time
+START_TIMEOUT_S = 30.0
+START_POLL_S = 0.05
+# Upload block size for forwarded audio files
+UPLOAD_BLOCK_BYTES = 65536
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP/1.1 over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout, blocksize=UPLOAD_BLOCK_BYTES)
+        self.path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+def _sibling(path: str, suffix: str) -> str:
+    return os.path.splitext(path)[0] + suffix
+
+def request(path: str, method: str, url: str, body: Any = None, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> Tuple[int, Dict[str, Any]]:
+    """Sends one request to the daemon listening on `path`; returns the status and the decoded JSON body.
+
+    A dict `body` is sent as JSON; a binary file object is streamed with chunked encoding.
+    """
+    headers = dict(headers or {})
+    chunked = False
+    if isinstance(body, dict):
+        body = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    elif body is not None and not isinstance(body, bytes):
+        headers["Transfer-Encoding"] = "chunked"
+        chunked = True
+    conn = _UnixHTTPConnection(path, timeout)
+    try:
+        conn.request(method, url, body, headers, encode_chunked=chunked)
+        response = conn.getresponse()
+        raw = response.read()
+    finally:
+        conn.close()
+    try:
+        data = json.loads(raw) if raw else {}
+    except ValueError:
+        data = {"detail": raw.decode(errors="replace")}
+    return response.status, data
+
+def is_running(path: str = DEFAULT_SOCKET) -> bool:
+    """True when a daemon accepts connections on `path`."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+def prepare_socket(path: str = DEFAULT_SOCKET) -> None:
+    """Makes `path` ready to be bound by a new daemon; RuntimeError if another one is already listening on it."""
+    if is_running(path):
+        raise RuntimeError(f"A reachy-tts daemon is already listening on {path}")
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)  # Left behind by a daemon that did not shut down cleanly
+
+def listen(path: str = DEFAULT_SOCKET) -> socket.socket:
+    """Binds the daemon socket, accessible to the current user only, and records the daemon's pid."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+        os.chmod(path, 0o600)
+        sock.listen(socket.SOMAXCONN)
+    except OSError:
+        sock.close()
+        raise
+    with open(_sibling(path, ".pid"), "w") as f:
+        f.write(str(os.getpid()))
+    return sock
+
+def cleanup_socket(path: str = DEFAULT_SOCKET) -> None:
+    for p in (path, _sibling(path, ".pid")):
+        try:
+            os.unlink(p)
+        except OSError:
+            pass
+
+def start(argv: List[str], path: str = DEFAULT_SOCKET, env: Optional[Dict[str, str]] = None, timeout: float = START_TIMEOUT_S) -> None:
+    """Starts a detached daemon (`reachy-tts --daemon` with the server options in `argv`) unless one is running.
+
+    Returns once it accepts connections. A lock file keeps concurrent callers from starting two daemons.
+    Its output goes to a log file next to the socket; raises RuntimeError if it exits or never comes up.
+    """
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    log_path = _sibling(path, ".log")
+    with open(_sibling(path, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if is_running(path):
+            return
+        print(f"Starting the reachy-tts daemon (log: {log_path})...", file=sys.stderr)
+        with open(log_path, "ab") as log:
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "reachy_tts.cli", "--daemon", "--socket", path, *argv],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, env=env, start_new_session=True
+            )
+        deadline = time.monotonic() + timeout
+        while not is_running(path):
+            if proc.poll() is not None:
+                raise RuntimeError(f"The reachy-tts daemon exited with status {proc.returncode}; see {log_path}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"The reachy-tts daemon did not start within {timeout:.0f}s; see {log_path}")
+            time.sleep(START_POLL_S)
+
+def stop(path: str = DEFAULT_SOCKET) -> bool:
+    """Asks the daemon on `path` to shut down; False if none was running."""
+    if not is_running(path):
+        return False
+    try:
+        with open(_sibling(path, ".pid")) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, signal.SIGTERM)
+    except (OSError, ValueError):
+        return False
+    return True
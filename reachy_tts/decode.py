@@ -0,0 +1,235 @@
+import os
+import shutil
+import struct
+import threading
+import subprocess
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+import numpy as np
+
+from reachy_tts.defaults import DEFAULT_RAW_SR
+from reachy_tts.kinematics import _to_float32_mono
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Compressed TTS response formats, decoded by an ffmpeg subprocess, and the demuxer each one is read with
+COMPRESSED_FORMATS = {"opus": "ogg", "aac": "aac", "mp3": "mp3", "flac": "flac"}
+
+class AudioSource(NamedTuple):
+    """Mono int16 PCM chunks and their sample rate."""
+    sr: int
+    chunks: Iterator[bytes]
+
+class AudioDecoder:
+    """Incrementally turns a WAV or raw PCM byte stream into mono int16 PCM at the source rate.
+
+    Input starting with a RIFF header is parsed as WAV (8/16/24/32-bit integer or 32/64-bit float, any
+    channel count); anything else is raw little-endian int16 with `sr` and `channels`. `feed` returns
+    the PCM decoded so far; `sr` is known once `ready` is True.
+    """
+
+    def __init__(self, sr: int = DEFAULT_RAW_SR, channels: int = 1):
+        self.sr: Optional[int] = None
+        self.channels = channels
+        self._raw_sr = sr
+        self._buf = bytearray()
+        self._skip = 0
+        self._stage = "detect"
+        self._dtype = np.dtype("<i2")
+        self._width = 2
+
+    @property
+    def ready(self) -> bool:
+        return self._stage == "data"
+
+    def feed(self, data: bytes) -> bytes:
+        self._buf.extend(data)
+        if self._stage != "data":
+            self._parse_header()
+            if self._stage != "data":
+                return b""
+        frame_bytes = self._width * self.channels
+        usable = len(self._buf) - len(self._buf) % frame_bytes
+        if not usable:
+            return b""
+        block = bytes(self._buf[:usable])
+        del self._buf[:usable]
+        return self._convert(block)
+
+    def _parse_header(self):
+        buf = self._buf
+        if self._stage == "detect":
+            if len(buf) < 4:
+                return
+            if buf[:4] != b"RIFF":
+                self.sr = self._raw_sr
+                self._stage = "data"
+                return
+            self._stage = "riff"
+        if self._stage == "riff":
+            if len(buf) < 12:
+                return
+            if buf[8:12] != b"WAVE":
+                raise ValueError("Not a WAVE file.")
+            del buf[:12]
+            self._stage = "chunks"
+        while self._stage == "chunks":
+            if self._skip:
+                n = min(self._skip, len(buf))
+                del buf[:n]
+                self._skip -= n
+                if self._skip:
+                    return
+            if len(buf) < 8:
+                return
+            chunk_id = bytes(buf[:4])
+            size = struct.unpack("<I", buf[4:8])[0]
+            if chunk_id == b"data":
+                # The size is ignored: streaming writers often leave it at 0 or 0xFFFFFFFF
+                if self.sr is None:
+                    raise ValueError("WAV data chunk before its fmt chunk.")
+                del buf[:8]
+                self._stage = "data"
+                return
+            if chunk_id == b"fmt ":
+                if len(buf) < 8 + size:
+                    return
+                self._parse_fmt(bytes(buf[8 : 8 + size]))
+                del buf[: 8 + size]
+                self._skip = size % 2
+            else:
+                del buf[:8]
+                self._skip = size + size % 2
+
+    def _parse_fmt(self, fmt: bytes):
+        if len(fmt) < 16:
+            raise ValueError("Truncated WAV fmt chunk.")
+        code, channels, rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if code == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            code = struct.unpack("<H", fmt[24:26])[0]
+        if channels < 1 or rate < 1:
+            raise ValueError(f"Invalid WAV format: {channels} channels at {rate} Hz.")
+        if code == _WAVE_FORMAT_FLOAT and bits in (32, 64):
+            self._dtype = np.dtype(f"<f{bits // 8}")
+        elif code == _WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+            self._dtype = {8: np.dtype("u1"), 16: np.dtype("<i2"), 24: None, 32: np.dtype("<i4")}[bits]
+        else:
+            raise ValueError(f"Unsupported WAV encoding (format {code:#06x}, {bits} bits).")
+        self._width = bits // 8
+        self.channels = channels
+        self.sr = rate
+
+    def _convert(self, block: bytes) -> bytes:
+        if self._dtype == np.dtype("<i2") and self.channels == 1:
+            return block
+        if self._width == 3:
+            b = np.frombuffer(block, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            x = (b[:, 0] << 8) | (b[:, 1] << 16) | (b[:, 2] << 24)  # Left-aligned, so int32 scaling applies
+        elif self._dtype == np.dtype("u1"):
+            x = (np.frombuffer(block, dtype=np.uint8) ^ 0x80).view(np.int8)
+        else:
+            x = np.frombuffer(block, dtype=self._dtype)
+        mono = _to_float32_mono(x)
+        if self.channels > 1:
+            mono = mono.reshape(-1, self.channels).mean(axis=1)
+        return (np.clip(mono, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+
+def decode_audio(chunks: Iterable[bytes], sr: int = DEFAULT_RAW_SR, channels: int = 1) -> AudioSource:
+    """Reads just enough of `chunks` to learn the format, then decodes the rest lazily."""
+    decoder = AudioDecoder(sr, channels)
+    source = iter(chunks)
+    head = []
+    for data in source:
+        pcm = decoder.feed(data)
+        if pcm:
+            head.append(pcm)
+        if decoder.ready:
+            break
+    if not decoder.ready:
+        raise ValueError("Audio ended before its format could be read.")
+
+    def _rest() -> Iterator[bytes]:
+        yield from head
+        for data in source:
+            pcm = decoder.feed(data)
+            if pcm:
+                yield pcm
+
+    return AudioSource(decoder.sr, _rest())
+
+def iter_file(f, chunk_size: int = 65536) -> Iterator[bytes]:
+    """Reads a binary file object in chunks until EOF."""
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            return
+        yield data
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+def decode_compressed(chunks: Iterable[bytes], fmt: str, sr: int, chunk_size: int = 4096) -> Iterator[bytes]:
+    """Decodes a compressed stream (see `COMPRESSED_FORMATS`) to mono int16 PCM at `sr` as it arrives.
+
+    The encoded chunks are piped through ffmpeg from a feeder thread, and decoded PCM is yielded as
+    soon as ffmpeg emits it, so playback does not wait for the whole file. Closing the generator kills
+    the decoder, and the feeder then closes `chunks` so the request behind it is abandoned.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"Decoding '{fmt}' audio requires ffmpeg on the PATH.")
+    proc = subprocess.Popen(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-probesize", "32", "-analyzeduration", "0", "-fflags", "nobuffer",
+         "-f", COMPRESSED_FORMATS[fmt], "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(sr), "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    errors: List[BaseException] = []
+
+    def _feed():
+        source = iter(chunks)
+        try:
+            for chunk in source:
+                proc.stdin.write(chunk)
+                proc.stdin.flush()
+        except BrokenPipeError:
+            pass  # Decoder killed: the consumer went away
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    feeder = threading.Thread(target=_feed, name="tts-decode", daemon=True)
+    feeder.start()
+    complete = False
+    try:
+        odd = b""
+        fd = proc.stdout.fileno()
+        while True:
+            data = os.read(fd, chunk_size)
+            if not data:
+                break
+            data = odd + data
+            usable = len(data) - len(data) % 2
+            odd = data[usable:]
+            if usable:
+                yield data[:usable]
+        feeder.join()
+        if errors:
+            raise errors[0]
+        if proc.wait() != 0:
+            detail = proc.stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg could not decode the '{fmt}' stream: {detail or f'exit status {proc.returncode}'}")
+        complete = True
+    finally:
+        if not complete:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
@@ -0,0 +1,25 @@
+"""
+Defaults shared by the command line and the modules that use them.
+
+Only the standard library may be imported here: the CLI builds its parser from these values
+before deciding whether NumPy, the robot SDK and the web stack need to be loaded at all.
+"""
+
+BACKEND_NAMES = ("openai", "http", "local")
+# Transfer formats of remote TTS responses; "auto" picks raw PCM or opus from the measured bandwidth
+TTS_FORMATS = ("auto", "pcm", "opus", "aac", "mp3", "flac")
+# Remote requests are duplicated once their first byte is later than this percentile of recent ones
+DEFAULT_HEDGE_PERCENTILE = 95.0
+# A remote request fails when its first byte, or any later chunk, takes longer than this
+DEFAULT_DEADLINE_S = 10.0
+
+# Output device of robots given without their own speaker
+DEFAULT_SPEAKER = "reSpeaker XVF3800"
+
+# Raw (headerless) input is assumed to be 16-bit little-endian PCM at this rate unless told otherwise
+DEFAULT_RAW_SR = 24000
+
+# Rate at which head targets are sent; poses are interpolated between the 50 ms analysis hops
+DEFAULT_CONTROL_HZ = 50.0
+# Fast mode: idle time after the last utterance before the head returns to neutral
+DEFAULT_IDLE_RETURN_S = 2.0
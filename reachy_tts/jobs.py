@@ -0,0 +1,209 @@
+import time
+import uuid
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from reachy_tts.cancel import CancelToken
+
+PRIORITIES = {"urgent": 0, "normal": 1, "low": 2}
+DEFAULT_MAX_DEPTH = 16
+MAX_FINISHED_JOBS = 256
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth."""
+
+@dataclass
+class TTSJob:
+    params: Dict[str, Any]
+    priority: str = "normal"
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    resources: Tuple[str, ...] = ()
+    prefetch: Optional[Future] = None
+    cancel: CancelToken = field(default_factory=CancelToken)
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "text": self.params.get("text"),
+            "resources": list(self.resources),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobQueue:
+    """Priority queue of TTS jobs, run concurrently as long as they use disjoint resources.
+
+    `run(job, pcm)` speaks a job; `prefetch(job)` synthesizes one ahead of time and returns its PCM,
+    or None for a job it leaves to `run`, giving up once `job.cancel` is set.
+    A job holds its `resources` (robot names) while it runs; jobs submitted without any share one
+    implicit resource and run one at a time. A queued job never starts ahead of a higher-priority
+    job waiting for the same resource. While jobs are being spoken, the next queued job is
+    prefetched so synthesis and playback overlap.
+    """
+
+    def __init__(self, run: Callable[[TTSJob, Optional[bytes]], None], prefetch: Optional[Callable[[TTSJob], bytes]] = None, max_depth: int = DEFAULT_MAX_DEPTH):
+        self._run = run
+        self._prefetch = prefetch
+        self.max_depth = max_depth
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._jobs: "OrderedDict[str, TTSJob]" = OrderedDict()
+        self._running: "OrderedDict[str, TTSJob]" = OrderedDict()
+        self._busy: Set[str] = set()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-prefetch") if prefetch else None
+
+    def submit(self, params: Dict[str, Any], priority: str = "normal", resources: Tuple[str, ...] = ()) -> TTSJob:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of: {', '.join(PRIORITIES)})")
+        job = TTSJob(params=params, priority=priority, resources=tuple(resources))
+        with self._cond:
+            if len(self._heap) >= self.max_depth:
+                raise QueueFullError(f"TTS queue is full ({self.max_depth} jobs pending).")
+            heapq.heappush(self._heap, (PRIORITIES[priority], next(self._seq), job))
+            self._jobs[job.id] = job
+            self._trim_finished()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="tts-worker", daemon=True)
+                self._worker.start()
+            if self._running:
+                self._start_prefetch()
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[TTSJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[TTSJob]:
+        """Drops a queued job, or stops a running one at its next hop. Returns the job, None if unknown."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            queued = any(entry[2] is job for entry in self._heap)
+            if queued:
+                self._heap = [entry for entry in self._heap if entry[2] is not job]
+                heapq.heapify(self._heap)
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                if job.prefetch is not None:
+                    job.prefetch.cancel()  # Not started yet; one in progress stops on `job.cancel` below
+                    job.prefetch = None
+                self._cond.notify()
+        job.cancel.cancel()
+        if queued:
+            job.done.set()
+        return job
+
+    def cancel_running(self, resources: Optional[Iterable[str]] = None) -> List[TTSJob]:
+        """Stops every running job, or only those using one of `resources`."""
+        with self._cond:
+            running = list(self._running.values())
+        if resources is not None:
+            wanted = set(resources)
+            running = [j for j in running if not wanted.isdisjoint(self._keys(j))]
+        for job in running:
+            job.cancel.cancel()
+        return running
+
+    def position(self, job: TTSJob) -> Optional[int]:
+        """0-based position of a queued job in dispatch order, None if it is no longer queued."""
+        with self._cond:
+            pending = [j for _, _, j in sorted(self._heap)]
+        return pending.index(job) if job in pending else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = [j for _, _, j in sorted(self._heap)]
+            running = list(self._running.values())
+        return {
+            "depth": len(pending),
+            "max_depth": self.max_depth,
+            "current": running[0].to_dict() if running else None,
+            "running": [j.to_dict() for j in running],
+            "queued": [j.to_dict() for j in pending],
+        }
+
+    def _trim_finished(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.done.is_set()]
+        for jid in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[jid]
+
+    def _start_prefetch(self) -> None:
+        """Starts synthesizing the job that will run next (caller holds the lock)."""
+        if self._prefetcher is None or not self._heap:
+            return
+        nxt = self._heap[0][2]
+        if nxt.prefetch is None:
+            nxt.prefetch = self._prefetcher.submit(self._prefetch, nxt)
+
+    @staticmethod
+    def _keys(job: TTSJob) -> Tuple[str, ...]:
+        return job.resources or ("",)
+
+    def _next_runnable(self) -> Optional[TTSJob]:
+        """Highest-priority queued job whose resources are free and not awaited by a job ahead of it (caller holds the lock)."""
+        reserved = set(self._busy)
+        for _, _, job in sorted(self._heap):
+            keys = self._keys(job)
+            if reserved.isdisjoint(keys):
+                return job
+            reserved.update(keys)
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_runnable()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_runnable()
+                self._heap = [entry for entry in self._heap if entry[2] is not job]
+                heapq.heapify(self._heap)
+                self._busy.update(self._keys(job))
+                self._running[job.id] = job
+                job.status = "speaking"
+                job.started_at = time.time()
+                self._start_prefetch()
+            threading.Thread(target=self._execute, args=(job,), name=f"tts-job-{job.id[:8]}", daemon=True).start()
+
+    def _execute(self, job: TTSJob) -> None:
+        pcm = None
+        # A prefetch not started yet is queued behind another job's: synthesizing live is sooner
+        if job.prefetch is not None and not job.prefetch.cancel():
+            try:
+                pcm = job.prefetch.result()
+            except Exception:
+                pcm = None  # Fall back to live synthesis, which reports the error if it persists
+
+        try:
+            self._run(job, pcm)
+            job.status = "cancelled" if job.cancel.is_set() else "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.prefetch = None
+            job.finished_at = time.time()
+            with self._cond:
+                self._busy.difference_update(self._keys(job))
+                del self._running[job.id]
+                self._cond.notify()
+            job.done.set()
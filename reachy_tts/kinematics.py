@@ -1,9 +1,8 @@
 import math
+from functools import lru_cache
 import numpy as np
 from numpy.typing import NDArray
 from typing import Any, Dict, List
-from collections import deque
-from itertools import islice
 
 SR = 16_000
 FRAME_MS = 20
@@ -67,16 +66,120 @@ def _resample_linear(x: NDArray[np.float32], sr_in: int, sr_out: int) -> NDArray
     t_out = np.linspace(0.0, 1.0, num=n_out, dtype=np.float32, endpoint=True)
     return np.interp(t_out, t_in, x).astype(np.float32, copy=False)
 
+# Polyphase resampler: filter taps per phase and Kaiser window shape of the anti-aliasing lowpass
+RESAMPLE_TAPS = 24
+RESAMPLE_BETA = 8.0
+
+@lru_cache(maxsize=None)
+def _polyphase_filter(up: int, down: int, taps: int = RESAMPLE_TAPS) -> NDArray[np.float32]:
+    """Windowed-sinc lowpass for up/down resampling, split into `up` phases of `taps` coefficients.
+
+    Row `r` holds phase r in reversed order, so output samples are plain dot products with input windows.
+    """
+    n = taps * up
+    cutoff = 0.45 / max(up, down)  # Cycles per upsampled sample, a little under the narrower Nyquist
+    t = np.arange(n) - (n - 1) / 2.0
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * t) * np.kaiser(n, RESAMPLE_BETA)
+    h *= up / h.sum()
+    return np.ascontiguousarray(h.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler keeping filter history across calls.
+
+    Chunking does not change the result beyond float rounding: after N input samples exactly
+    `(N * up - 1) // down + 1` outputs have been produced, with no phase jump or drift at chunk boundaries.
+    """
+
+    __slots__ = ("sr_in", "sr_out", "up", "down", "_phases", "_taps", "_buf", "_out", "_n_in", "_n_out")
+
+    def __init__(self, sr_in: int, sr_out: int, taps: int = RESAMPLE_TAPS):
+        g = math.gcd(sr_in, sr_out)
+        self.sr_in = sr_in
+        self.sr_out = sr_out
+        self.up = sr_out // g
+        self.down = sr_in // g
+        self._phases = _polyphase_filter(self.up, self.down, taps)
+        self._taps = taps
+        self._buf = np.zeros(taps - 1, dtype=np.float32)  # History (taps - 1 samples) followed by the new chunk
+        self._out = np.zeros(0, dtype=np.float32)
+        self._n_in = 0
+        self._n_out = 0
+
+    def process(self, x: NDArray[np.float32]) -> NDArray[np.float32]:
+        """Resamples the next chunk; the returned array is only valid until the next call."""
+        hist = self._taps - 1
+        total = hist + x.size
+        if self._buf.size < total:
+            buf = np.zeros(total, dtype=np.float32)
+            buf[:hist] = self._buf[:hist]
+            self._buf = buf
+        self._buf[hist:total] = x
+
+        up, down = self.up, self.down
+        n_in = self._n_in + x.size
+        m0 = self._n_out
+        m1 = (n_in * up - 1) // down + 1 if n_in else 0
+        if self._out.size < m1 - m0:
+            self._out = np.zeros(m1 - m0, dtype=np.float32)
+        y = self._out[: m1 - m0]
+
+        # Outputs sharing m mod up use the same filter phase and read input windows `down` apart:
+        # a zero-copy strided view of the buffer, reduced against the phase in one call
+        step = self._buf.strides[0]
+        for q in range(up):
+            first = m0 + (q - m0) % up
+            if first >= m1:
+                continue
+            count = (m1 - 1 - first) // up + 1
+            start = (first * down) // up - self._n_in
+            windows = np.ndarray((count, self._taps), np.float32, self._buf, start * step, (down * step, step))
+            np.einsum("ij,j->i", windows, self._phases[(first * down) % up], out=y[first - m0 :: up])
+
+        self._buf[:hist] = self._buf[total - hist : total]
+        self._n_in = n_in
+        self._n_out = m1
+        return y
+
+POSE_KEYS = ("pitch_rad", "yaw_rad", "roll_rad", "x_mm", "y_mm", "z_mm")
+
+def _rms_dbfs_into(frame: NDArray[np.float32], scratch: NDArray[np.float32]) -> float:
+    """Same result as `_rms_dbfs`, squaring into a caller-owned buffer instead of a temporary."""
+    np.multiply(frame, frame, out=scratch)
+    ms = np.add.reduce(scratch, dtype=np.float32) / scratch.size
+    rms = np.sqrt(ms + 1e-12, dtype=np.float32)
+    return float(20.0 * math.log10(float(rms) + 1e-12))
+
 class SwayRollRT:
+    """Streaming head-sway analyser.
+
+    All per-hop state lives in preallocated float32 buffers: a `HOP` carry buffer for partial hops,
+    a `FRAME` ring holding the only history ever read back, and a reusable `poses` array
+    (one row of `POSE_KEYS` per produced hop), so the hop loop does no array allocations.
+    """
+
+    __slots__ = (
+        "_seed", "_resampler", "_carry", "_carry_n", "_ring", "_ring_pos", "_ring_fill", "_frame", "_scratch", "_input",
+        "poses", "vad_on", "vad_above", "vad_below", "sway_env", "sway_up", "sway_down",
+        "phase_pitch", "phase_yaw", "phase_roll", "phase_x", "phase_y", "phase_z", "t",
+    )
+
     def __init__(self, rng_seed: int = 7):
         self._seed = int(rng_seed)
-        self.samples: deque[float] = deque(maxlen=10 * SR)
-        self.carry = np.zeros(0, dtype=np.float32)
+        self._resampler: Any = None
+        self._carry = np.zeros(HOP, dtype=np.float32)
+        self._carry_n = 0
+        self._ring = np.zeros(FRAME, dtype=np.float32)
+        self._ring_pos = 0
+        self._ring_fill = 0
+        self._frame = np.zeros(FRAME, dtype=np.float32)
+        self._scratch = np.zeros(FRAME, dtype=np.float32)
+        self._input = np.zeros(0, dtype=np.float32)
+        self.poses = np.zeros((4, len(POSE_KEYS)), dtype=np.float64)
         self.vad_on = False
         self.vad_above = self.vad_below = 0
         self.sway_env = 0.0
         self.sway_up = self.sway_down = 0
-        
+
         rng = np.random.default_rng(self._seed)
         self.phase_pitch = float(rng.random() * 2 * math.pi)
         self.phase_yaw = float(rng.random() * 2 * math.pi)
@@ -86,25 +189,72 @@ class SwayRollRT:
         self.phase_z = float(rng.random() * 2 * math.pi)
         self.t = 0.0
 
-    def feed(self, pcm: NDArray[Any], sr: int) -> List[Dict[str, float]]:
-        x = _to_float32_mono(pcm)
-        if x.size == 0: return []
-        x = _resample_linear(x, sr, SR) if sr != SR else x
-
-        self.carry = np.concatenate([self.carry, x]) if self.carry.size else x
-        out: List[Dict[str, float]] = []
-
-        while self.carry.size >= HOP:
-            hop = self.carry[:HOP]
-            self.carry = self.carry[HOP:]
-            self.samples.extend(hop.tolist())
-            
-            if len(self.samples) < FRAME:
+    def _as_float32_mono(self, pcm: NDArray[Any]) -> NDArray[np.float32]:
+        """`_to_float32_mono`, converting plain 1-D integer input into a reused buffer."""
+        a = np.asarray(pcm)
+        if a.ndim != 1 or not np.issubdtype(a.dtype, np.integer):
+            return _to_float32_mono(a)
+        if self._input.size < a.size:
+            self._input = np.zeros(a.size, dtype=np.float32)
+        info = np.iinfo(a.dtype)
+        scale = float(max(-info.min, info.max))
+        out = self._input[: a.size]
+        np.divide(a, np.float32(scale if scale != 0.0 else 1.0), out=out)
+        return out
+
+    def _push_frame(self, hop: NDArray[np.float32]) -> None:
+        """Appends a hop to the FRAME ring, keeping only the newest FRAME samples."""
+        if hop.size >= FRAME:
+            self._ring[:] = hop[hop.size - FRAME :]
+            self._ring_pos = 0
+        else:
+            first = min(hop.size, FRAME - self._ring_pos)
+            self._ring[self._ring_pos : self._ring_pos + first] = hop[:first]
+            self._ring[: hop.size - first] = hop[first:]
+            self._ring_pos = (self._ring_pos + hop.size) % FRAME
+        self._ring_fill = min(FRAME, self._ring_fill + hop.size)
+
+    def _latest_frame(self) -> NDArray[np.float32]:
+        if self._ring_pos == 0:
+            return self._ring
+        tail = FRAME - self._ring_pos
+        self._frame[:tail] = self._ring[self._ring_pos :]
+        self._frame[tail:] = self._ring[: self._ring_pos]
+        return self._frame
+
+    def process(self, pcm: NDArray[Any], sr: int) -> int:
+        """Analyses a chunk of audio and writes one pose row per completed hop into `self.poses`.
+
+        Returns the number of rows written; they are only valid until the next call.
+        """
+        x = self._as_float32_mono(pcm)
+        if x.size == 0: return 0
+        if sr != SR:
+            if self._resampler is None or self._resampler.sr_in != sr:
+                self._resampler = PolyphaseResampler(sr, SR)
+            x = self._resampler.process(x)
+
+        max_out = (self._carry_n + x.size) // HOP
+        if self.poses.shape[0] < max_out:
+            self.poses = np.zeros((max_out, len(POSE_KEYS)), dtype=np.float64)
+
+        n_out = 0
+        pos = 0
+        while pos < x.size:
+            take = min(HOP - self._carry_n, x.size - pos)
+            self._carry[self._carry_n : self._carry_n + take] = x[pos : pos + take]
+            self._carry_n += take
+            pos += take
+            if self._carry_n < HOP:
+                break
+            self._carry_n = 0
+            self._push_frame(self._carry)
+
+            if self._ring_fill < FRAME:
                 self.t += HOP_MS / 1000.0
                 continue
 
-            frame = np.fromiter(islice(self.samples, len(self.samples) - FRAME, len(self.samples)), dtype=np.float32, count=FRAME)
-            db = _rms_dbfs(frame)
+            db = _rms_dbfs_into(self._latest_frame(), self._scratch)
 
             if db >= VAD_DB_ON:
                 self.vad_above += 1
@@ -125,7 +275,7 @@ class SwayRollRT:
             up = self.sway_up / SWAY_ATTACK_FR
             down = 1.0 - (self.sway_down / SWAY_RELEASE_FR)
             target = up if self.vad_on else down
-            
+
             self.sway_env += ENV_FOLLOW_GAIN * (target - self.sway_env)
             self.sway_env = max(0.0, min(1.0, self.sway_env))
 
@@ -133,15 +283,117 @@ class SwayRollRT:
             env = self.sway_env
             self.t += HOP_MS / 1000.0
 
-            pitch = math.radians(SWAY_A_PITCH_DEG) * loud * env * math.sin(2 * math.pi * SWAY_F_PITCH * self.t + self.phase_pitch)
-            yaw = math.radians(SWAY_A_YAW_DEG) * loud * env * math.sin(2 * math.pi * SWAY_F_YAW * self.t + self.phase_yaw)
-            roll = math.radians(SWAY_A_ROLL_DEG) * loud * env * math.sin(2 * math.pi * SWAY_F_ROLL * self.t + self.phase_roll)
-            x_mm = SWAY_A_X_MM * loud * env * math.sin(2 * math.pi * SWAY_F_X * self.t + self.phase_x)
-            y_mm = SWAY_A_Y_MM * loud * env * math.sin(2 * math.pi * SWAY_F_Y * self.t + self.phase_y)
-            z_mm = SWAY_A_Z_MM * loud * env * math.sin(2 * math.pi * SWAY_F_Z * self.t + self.phase_z)
-
-            out.append({
-                "pitch_rad": pitch, "yaw_rad": yaw, "roll_rad": roll,
-                "x_mm": x_mm, "y_mm": y_mm, "z_mm": z_mm,
-            })
-        return out
+            row = self.poses[n_out]
+            row[0] = math.radians(SWAY_A_PITCH_DEG) * loud * env * math.sin(2 * math.pi * SWAY_F_PITCH * self.t + self.phase_pitch)
+            row[1] = math.radians(SWAY_A_YAW_DEG) * loud * env * math.sin(2 * math.pi * SWAY_F_YAW * self.t + self.phase_yaw)
+            row[2] = math.radians(SWAY_A_ROLL_DEG) * loud * env * math.sin(2 * math.pi * SWAY_F_ROLL * self.t + self.phase_roll)
+            row[3] = SWAY_A_X_MM * loud * env * math.sin(2 * math.pi * SWAY_F_X * self.t + self.phase_x)
+            row[4] = SWAY_A_Y_MM * loud * env * math.sin(2 * math.pi * SWAY_F_Y * self.t + self.phase_y)
+            row[5] = SWAY_A_Z_MM * loud * env * math.sin(2 * math.pi * SWAY_F_Z * self.t + self.phase_z)
+            n_out += 1
+        return n_out
+
+    def feed(self, pcm: NDArray[Any], sr: int) -> List[Dict[str, float]]:
+        """Dict-per-hop view of `process`, kept for callers that want named fields."""
+        n = self.process(pcm, sr)
+        return [dict(zip(POSE_KEYS, row)) for row in self.poses[:n].tolist()]
+
+def _run_positions(v: NDArray[Any]) -> NDArray[np.int64]:
+    """1-based position of each element within its run of equal consecutive values."""
+    idx = np.arange(v.size)
+    if v.size == 0: return idx
+    change = np.empty(v.size, dtype=bool)
+    change[0] = True
+    np.not_equal(v[1:], v[:-1], out=change[1:])
+    return idx - np.maximum.accumulate(np.where(change, idx, 0)) + 1
+
+def sway_trajectory(pcm: NDArray[Any], sr: int, rng_seed: int = 7) -> Dict[str, NDArray[np.float64]]:
+    """Vectorized equivalent of `SwayRollRT(rng_seed).feed(pcm, sr)` for audio that is already fully known.
+
+    Returns one contiguous array per pose component (same keys as `feed`), one entry per hop.
+    """
+    phases = SwayRollRT(rng_seed)
+    x = _to_float32_mono(pcm)
+    x = PolyphaseResampler(sr, SR).process(x) if sr != SR else x
+
+    n_hops = x.size // HOP
+    t = np.cumsum(np.full(n_hops, HOP_MS / 1000.0))
+    ends = np.arange(1, n_hops + 1) * HOP
+    valid = ends >= FRAME
+    t, ends = t[valid], ends[valid]
+    n = ends.size
+    if n == 0:
+        return {k: np.zeros(0) for k in POSE_KEYS}
+
+    # Framed RMS over the last FRAME samples of every hop
+    frames = np.lib.stride_tricks.sliding_window_view(x[: ends[-1]], FRAME)[ends - FRAME]
+    ms = np.mean(frames * frames, axis=1, dtype=np.float32)
+    rms = np.sqrt(ms + 1e-12, dtype=np.float32)
+    db = 20.0 * np.log10(rms.astype(np.float64) + 1e-12)
+
+    # VAD hysteresis: the above/below counters ignore in-between hops, so run lengths over the
+    # decisive hops give the counters, and the latest on/off event decides the state
+    cat = np.where(db >= VAD_DB_ON, 1, np.where(db <= VAD_DB_OFF, -1, 0))
+    decisive = np.flatnonzero(cat)
+    counts = _run_positions(cat[decisive])
+    events = np.zeros(n, dtype=np.int8)
+    events[decisive[(cat[decisive] == 1) & (counts >= ATTACK_FR)]] = 1
+    events[decisive[(cat[decisive] == -1) & (counts >= RELEASE_FR)]] = -1
+    idx = np.arange(n)
+    last = np.maximum.accumulate(np.where(events != 0, idx, -1))
+    vad_on = (last >= 0) & (events[np.maximum(last, 0)] == 1)
+
+    # Sway attack/release ramps restart every time the VAD state flips
+    run = _run_positions(vad_on)
+    target = np.where(
+        vad_on,
+        np.minimum(run, SWAY_ATTACK_FR) / SWAY_ATTACK_FR,
+        1.0 - (np.minimum(run, SWAY_RELEASE_FR) / SWAY_RELEASE_FR),
+    )
+
+    # First-order envelope follower: the only true recurrence, kept as a scalar pass over plain floats
+    env = np.empty(n)
+    e = 0.0
+    for i, tgt in enumerate(target.tolist()):
+        e += ENV_FOLLOW_GAIN * (tgt - e)
+        e = max(0.0, min(1.0, e))
+        env[i] = e
+
+    g = np.clip((db + SENS_DB_OFFSET - SWAY_DB_LOW) / (SWAY_DB_HIGH - SWAY_DB_LOW), 0.0, 1.0)
+    loud = (g**LOUDNESS_GAMMA if LOUDNESS_GAMMA != 1.0 else g) * SWAY_MASTER
+
+    return {
+        "pitch_rad": math.radians(SWAY_A_PITCH_DEG) * loud * env * np.sin(2 * math.pi * SWAY_F_PITCH * t + phases.phase_pitch),
+        "yaw_rad": math.radians(SWAY_A_YAW_DEG) * loud * env * np.sin(2 * math.pi * SWAY_F_YAW * t + phases.phase_yaw),
+        "roll_rad": math.radians(SWAY_A_ROLL_DEG) * loud * env * np.sin(2 * math.pi * SWAY_F_ROLL * t + phases.phase_roll),
+        "x_mm": SWAY_A_X_MM * loud * env * np.sin(2 * math.pi * SWAY_F_X * t + phases.phase_x),
+        "y_mm": SWAY_A_Y_MM * loud * env * np.sin(2 * math.pi * SWAY_F_Y * t + phases.phase_y),
+        "z_mm": SWAY_A_Z_MM * loud * env * np.sin(2 * math.pi * SWAY_F_Z * t + phases.phase_z),
+    }
+
+def head_poses(offsets: NDArray[np.float64], neutral: NDArray[np.float64]) -> NDArray[np.float64]:
+    """Batched `compose_world_offset(neutral, create_head_pose(...))` for rows of POSE_KEYS offsets, as (n, 4, 4) matrices."""
+    offsets = np.atleast_2d(offsets)
+    pitch, yaw, roll = offsets[:, 0], offsets[:, 1], offsets[:, 2]
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    cr, sr = np.cos(roll), np.sin(roll)
+
+    # Extrinsic x-y-z (roll, pitch, yaw) rotation, as in create_head_pose: Rz(yaw) @ Ry(pitch) @ Rx(roll)
+    rot = np.empty((offsets.shape[0], 3, 3))
+    rot[:, 0, 0] = cy * cp
+    rot[:, 0, 1] = cy * sp * sr - sy * cr
+    rot[:, 0, 2] = cy * sp * cr + sy * sr
+    rot[:, 1, 0] = sy * cp
+    rot[:, 1, 1] = sy * sp * sr + cy * cr
+    rot[:, 1, 2] = sy * sp * cr - cy * sr
+    rot[:, 2, 0] = -sp
+    rot[:, 2, 1] = cp * sr
+    rot[:, 2, 2] = cp * cr
+
+    # World-frame offset: rotations compose as R_off @ R_neutral, translations (mm -> m) add
+    out = np.zeros((offsets.shape[0], 4, 4))
+    out[:, :3, :3] = rot @ neutral[:3, :3]
+    out[:, :3, 3] = neutral[:3, 3] + offsets[:, 3:6] / 1000.0
+    out[:, 3, 3] = 1.0
+    return out
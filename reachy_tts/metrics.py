@@ -0,0 +1,129 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Buckets (seconds) for request/stage latencies and for per-hop work inside the 50 ms control loop
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+HOP_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+
+_REGISTRY: List["_Metric"] = []
+
+def _labels(names: Sequence[str], values: Tuple[str, ...]) -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+
+class Gauge(_Metric):
+    """A settable value, or one read from `fn` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self.fn = fn
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def _samples(self) -> List[str]:
+        value = self._value
+        if self.fn is not None:
+            try:
+                value = float(self.fn())
+            except Exception:
+                return []
+        return [f"{self.name} {value}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+TTS_TTFB = Histogram("reachy_tts_api_ttfb_seconds", "Time from sending a TTS request to its first audio byte.")
+TTS_SYNTHESIS = Histogram("reachy_tts_synthesis_seconds", "Total time to receive a TTS response.")
+DECODE = Histogram("reachy_tts_decode_seconds", "Time per utterance spent turning received audio into playable hops.")
+FIRST_SOUND = Histogram("reachy_tts_time_to_first_sound_seconds", "Time from the start of an utterance to its first audio write.")
+SWAY_FEED = Histogram("reachy_tts_sway_feed_seconds", "SwayRollRT analysis time per hop.", HOP_BUCKETS)
+SET_TARGET = Histogram("reachy_tts_set_target_seconds", "Latency of reachy.set_target calls.", HOP_BUCKETS)
+OVERRUNS = Counter("reachy_tts_motion_overruns_total", "Poses sent late, skipped by the motion loop or dropped while the robot was still busy with an older one.", ("kind",))
+UNDERRUNS = Counter("reachy_tts_audio_underruns_total", "Times the audio device ran dry mid-utterance.")
+CACHE_REQUESTS = Counter("reachy_tts_cache_requests_total", "Audio cache lookups.", ("result",))
+TTS_BYTES = Counter("reachy_tts_backend_bytes_total", "Bytes received from remote TTS backends, by transfer format.", ("format",))
+HEDGES = Counter("reachy_tts_backend_hedges_total", "Duplicate TTS requests sent because the first byte was late (or the request failed), by backend.", ("backend",))
+HEDGE_WINS = Counter("reachy_tts_backend_hedge_wins_total", "Utterances served by the duplicate request rather than the original, by backend.", ("backend",))
+DEADLINES = Counter("reachy_tts_backend_deadline_exceeded_total", "TTS requests abandoned for sending no audio within the deadline, by backend.", ("backend",))
+FAILOVERS = Counter("reachy_tts_backend_failovers_total", "Utterances moved to the fallback backend, by failed backend.", ("backend",))
+CANCELLATIONS = Counter("reachy_tts_cancellations_total", "Utterances stopped before their end.")
+ERRORS = Counter("reachy_tts_errors_total", "Failed utterances by exception type.", ("type",))
+SPEAKING = Gauge("reachy_tts_speaking", "1 while an utterance is being played.")
@@ -0,0 +1,68 @@
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional
+
+from reachy_tts.backends import as_backend
+from reachy_tts.core import _cache_model, _prefetch_pcm, _trajectory_bytes, OPENAI_SR
+
+# Concurrent synthesis requests while rendering; higher than live segmented mode since nothing is played
+RENDER_CONCURRENCY = 8
+
+def read_phrases(lines: Iterable[str]) -> List[str]:
+    """One phrase per non-empty line, in order and without duplicates; lines starting with '#' are comments."""
+    phrases = (line.strip() for line in lines)
+    return list(dict.fromkeys(p for p in phrases if p and not p.startswith("#")))
+
+def render_phrases(backend, phrases: List[str], voice: str, model: str, cache, concurrency: int = RENDER_CONCURRENCY, processes: Optional[int] = None) -> Dict[str, Any]:
+    """Synthesizes every phrase into the on-disk `cache` and stores its head motion next to it.
+
+    Synthesis runs on `concurrency` threads; the sway analysis of each phrase runs in a pool of
+    `processes` (all cores by default) as soon as its audio is in. Phrases whose audio and motion
+    are both stored already are skipped. Speaking a rendered phrase then needs no network and no
+    per-hop analysis. Returns counts and timings of the run.
+    """
+    backend = as_backend(backend)
+    cache_model = _cache_model(backend.name, model)
+    todo = [p for p in phrases if not (cache.contains(p, voice, cache_model) and cache.get_motion(p, voice, cache_model))]
+    stats = {"phrases": len(phrases), "skipped": len(phrases) - len(todo), "rendered": 0, "failed": 0, "audio_s": 0.0, "wall_s": 0.0}
+    if not todo:
+        return stats
+
+    def _failed(text: str, reason) -> None:
+        print(f"Error rendering '{text}': {reason}", file=sys.stderr)
+        stats["failed"] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tts-render") as synth, ProcessPoolExecutor(max_workers=processes) as analysis:
+        synthesizing = {synth.submit(_prefetch_pcm, backend, text, voice, model, cache): text for text in todo}
+        analysing = {}
+        pending = set(synthesizing)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in synthesizing:
+                    text = synthesizing.pop(future)
+                    try:
+                        pcm = bytes(future.result())
+                    except Exception as e:
+                        _failed(text, e)
+                        continue
+                    stats["audio_s"] += len(pcm) / 2 / OPENAI_SR
+                    motion = analysis.submit(_trajectory_bytes, pcm, OPENAI_SR)
+                    analysing[motion] = text
+                    pending.add(motion)
+                    continue
+                text = analysing.pop(future)
+                try:
+                    stored = cache.store_motion(text, voice, cache_model, future.result())
+                except Exception as e:
+                    _failed(text, e)
+                    continue
+                if not stored:
+                    _failed(text, "the audio could not be stored in the cache directory")
+                    continue
+                stats["rendered"] += 1
+                print(f"[{stats['skipped'] + stats['rendered'] + stats['failed']}/{len(phrases)}] {text}")
+    stats["wall_s"] = time.perf_counter() - start
+    return stats
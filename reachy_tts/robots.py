@@ -0,0 +1,78 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_ROBOT = "default"
+# Target name that addresses every robot in the pool
+ALL_ROBOTS = "all"
+
+@dataclass
+class Robot:
+    """One `ReachyMini` connection and the speaker its voice comes out of."""
+    name: str
+    reachy: Any
+    speaker: Optional[str] = None
+    host: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "host": self.host, "speaker": self.speaker, "busy": self.lock.locked()}
+
+def parse_robot_spec(spec: str) -> Tuple[str, str, Optional[str]]:
+    """Splits a `NAME=HOST[@SPEAKER]` command-line spec into its parts."""
+    name, sep, rest = spec.partition("=")
+    host, _, speaker = rest.partition("@")
+    if not sep or not name or not host:
+        raise ValueError(f"Invalid robot '{spec}' (expected NAME=HOST[@SPEAKER])")
+    return name, host, speaker or None
+
+def parse_group_spec(spec: str) -> Tuple[str, List[str]]:
+    """Splits a `NAME=ROBOT,ROBOT` command-line spec into the group name and its members."""
+    name, sep, rest = spec.partition("=")
+    members = [m.strip() for m in rest.split(",") if m.strip()]
+    if not sep or not name or not members:
+        raise ValueError(f"Invalid group '{spec}' (expected NAME=ROBOT,ROBOT)")
+    return name, members
+
+class RobotPool:
+    """Named robots and groups of robots that one server speaks through."""
+
+    def __init__(self, robots: Optional[List[Robot]] = None, groups: Optional[Dict[str, List[str]]] = None):
+        self.robots: Dict[str, Robot] = {}
+        self.groups: Dict[str, List[str]] = {}
+        for robot in robots or []:
+            self.add(robot)
+        for name, members in (groups or {}).items():
+            self.add_group(name, members)
+
+    def add(self, robot: Robot) -> None:
+        if robot.name in self.robots or robot.name == ALL_ROBOTS:
+            raise ValueError(f"Duplicate or reserved robot name '{robot.name}'")
+        self.robots[robot.name] = robot
+
+    def add_group(self, name: str, members: List[str]) -> None:
+        if name in self.robots or name == ALL_ROBOTS:
+            raise ValueError(f"Group name '{name}' clashes with a robot name")
+        unknown = [m for m in members if m not in self.robots]
+        if unknown:
+            raise ValueError(f"Group '{name}' references unknown robots: {', '.join(unknown)}")
+        self.groups[name] = list(dict.fromkeys(members))
+
+    @property
+    def default(self) -> Optional[Robot]:
+        return next(iter(self.robots.values()), None)
+
+    def resolve(self, target: Optional[str] = None) -> List[Robot]:
+        """Robots addressed by a robot name, a group name or "all"; the first robot when no target is given."""
+        if not target:
+            return [self.default] if self.robots else []
+        if target == ALL_ROBOTS:
+            return list(self.robots.values())
+        if target in self.groups:
+            return [self.robots[name] for name in self.groups[target]]
+        if target in self.robots:
+            return [self.robots[target]]
+        raise ValueError(f"Unknown robot or group '{target}' (available: {', '.join([*self.robots, *self.groups, ALL_ROBOTS])})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"robots": [r.to_dict() for r in self.robots.values()], "groups": dict(self.groups)}
@@ -0,0 +1,79 @@
+import re
+from typing import List
+
+# Segments shorter than this are merged into their neighbour: tiny requests sound clipped
+MIN_SEGMENT_CHARS = 24
+# Sentences longer than this are further split at clause boundaries
+MAX_SEGMENT_CHARS = 240
+
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?…])|(?<=[.!?…][\"')\]]))\s+|\n+")
+_CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+
+def _split_long(sentence: str) -> List[str]:
+    if len(sentence) <= MAX_SEGMENT_CHARS:
+        return [sentence]
+    parts: List[str] = []
+    current = ""
+    for clause in _CLAUSE_END.split(sentence):
+        if current and len(current) + 1 + len(clause) > MAX_SEGMENT_CHARS:
+            parts.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}" if current else clause
+    if current:
+        parts.append(current)
+    return parts
+
+def split_segments(text: str) -> List[str]:
+    """Splits text at sentence (and, for very long sentences, clause) boundaries for independent synthesis."""
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if sentence:
+            pieces.extend(_split_long(sentence))
+
+    segments: List[str] = []
+    for piece in pieces:
+        if segments and len(segments[-1]) < MIN_SEGMENT_CHARS:
+            segments[-1] = f"{segments[-1]} {piece}"
+        else:
+            segments.append(piece)
+    if len(segments) > 1 and len(segments[-1]) < MIN_SEGMENT_CHARS:
+        tail = segments.pop()
+        segments[-1] = f"{segments[-1]} {tail}"
+    return segments
+
+class SegmentStream:
+    """Incremental `split_segments` for text that arrives in fragments (e.g. tokens from an LLM).
+
+    `feed` returns the segments that later text can no longer change; `flush` returns the rest.
+    """
+
+    def __init__(self):
+        self._text = ""
+
+    def feed(self, fragment: str) -> List[str]:
+        self._text += fragment
+        boundary = None
+        for boundary in _SENTENCE_END.finditer(self._text):
+            pass
+        if boundary is None:
+            if len(self._text) <= MAX_SEGMENT_CHARS:
+                return []
+            # A very long sentence still being written: release its finished clauses
+            parts = _split_long(self._text.strip())
+            self._text = parts.pop() if parts else ""
+            return parts
+
+        segments = split_segments(self._text[: boundary.end()])
+        rest = self._text[boundary.end():]
+        if segments and len(segments[-1]) < MIN_SEGMENT_CHARS:
+            # Too short to send alone: it will be merged into whatever comes next
+            rest = f"{segments.pop()} {rest}"
+        self._text = rest
+        return segments
+
+    def flush(self) -> List[str]:
+        segments = split_segments(self._text)
+        self._text = ""
+        return segments
@@ -1,19 +1,45 @@
+import os
+import sys
 import json
+import time
+import queue
+import asyncio
 import threading
-from typing import Optional
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from typing import Dict, Iterator, Optional
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from starlette.requests import ClientDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
-from reachy_tts.core import _execute_tts_movement
+from reachy_tts.core import _execute_tts_on_robots, _prefetch_pcm, OPENAI_SR, DEFAULT_IDLE_RETURN_S, DEFAULT_CONTROL_HZ
+from reachy_tts import metrics, trace
+from reachy_tts.jobs import JobQueue, QueueFullError, TTSJob, DEFAULT_MAX_DEPTH
+from reachy_tts.robots import RobotPool
+from reachy_tts.segments import SegmentStream
+from reachy_tts.decode import AudioDecoder, DEFAULT_RAW_SR
 
 app = FastAPI(title="Reachy TTS HTTP Server")
 
-_GLOBAL_REACHY = None
-_GLOBAL_OPENAI = None
-_GLOBAL_SPEAKER = None
+# Robots (each with its default speaker) and named groups that requests can target
+_ROBOT_POOL: Optional[RobotPool] = None
+# Default TTS backend, and every configured backend by name for per-request selection
+_GLOBAL_BACKEND = None
+_GLOBAL_BACKENDS: Dict[str, object] = {}
 _UI_ENABLED = False
-_TTS_LOCK = threading.Lock()
+_GLOBAL_CACHE = None
+_GLOBAL_AUDIO = None
+_FAST_MODE = False
+_IDLE_RETURN_S = DEFAULT_IDLE_RETURN_S
+_CONTROL_HZ = DEFAULT_CONTROL_HZ
+_MAX_QUEUE_DEPTH = DEFAULT_MAX_DEPTH
+_JOB_QUEUE = None
+# When set, each job's timeline is written next to this path as <name>-<job id>.json
+_PROFILE_PATH: Optional[str] = None
+# The recorder is process-wide, so profiled jobs on different robots are run one at a time
+_PROFILE_LOCK = threading.Lock()
+
+# /play: decoded upload chunks held ahead of playback; beyond that the upload is throttled to the playback rate
+PLAY_BUFFER_CHUNKS = 16
 
 VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
 
@@ -169,6 +195,12 @@ UI_HTML = """
             transform: translateY(0);
         }
 
+        button.secondary {
+            margin-top: 0.75rem;
+            background: transparent;
+            border: 1px solid var(--border);
+        }
+
         button:disabled {
             opacity: 0.6;
             cursor: not-allowed;
@@ -223,6 +255,7 @@ UI_HTML = """
         </div>
 
         <button id="submitBtn">Speak Now</button>
+        <button id="stopBtn" class="secondary">Stop</button>
         <div id="status" class="status"></div>
     </div>
 
@@ -239,6 +272,10 @@ UI_HTML = """
             volValue.textContent = e.target.value;
         });
 
+        document.getElementById('stopBtn').addEventListener('click', () => {
+            fetch('/stop', { method: 'POST' });
+        });
+
         voices.forEach(v => {
             const opt = document.createElement('option');
             opt.value = v;
@@ -266,10 +303,18 @@ UI_HTML = """
                 });
 
                 const data = await response.json();
-                if (response.ok) {
+                if (!response.ok) {
+                    showStatus(data.detail || 'An error occurred.', 'error');
+                    return;
+                }
+
+                const job = await waitForJob(data.job_id);
+                if (job.status === 'done') {
                     showStatus('Speech completed successfully.', 'success');
+                } else if (job.status === 'cancelled') {
+                    showStatus('Speech stopped.', 'success');
                 } else {
-                    showStatus(data.detail || 'An error occurred.', 'error');
+                    showStatus(job.error || 'An error occurred.', 'error');
                 }
             } catch (err) {
                 showStatus('Server connection failed.', 'error');
@@ -278,6 +323,18 @@ UI_HTML = """
             }
         });
 
+        async function waitForJob(jobId) {
+            while (true) {
+                const job = await (await fetch('/tts/' + jobId)).json();
+                if (job.status === 'done' || job.status === 'failed' || job.status === 'cancelled') {
+                    return job;
+                }
+                showStatus(job.status === 'queued' ? 'Queued (position ' + (job.position + 1) + ')' : 'Speaking', 'loading');
+                statusDiv.classList.add('loading-dots');
+                await new Promise(r => setTimeout(r, 500));
+            }
+        }
+
         function showStatus(msg, type) {
             statusDiv.textContent = msg;
             statusDiv.className = 'status ' + type;
@@ -299,12 +356,21 @@ UI_HTML = """
 </html>
 """
 
-class TTSRequest(BaseModel):
-    text: str
+class TTSOptions(BaseModel):
     voice: Optional[str] = "alloy"
     model: Optional[str] = "tts-1"
     speaker: Optional[str] = None
     volume: Optional[int] = None
+    fast: Optional[bool] = None
+    backend: Optional[str] = None
+    robot: Optional[str] = None  # Robot name, group name or "all"; the first robot when omitted
+    priority: Optional[str] = "normal"
+
+class TTSRequest(TTSOptions):
+    text: str
+    stream: Optional[bool] = False
+    segmented: Optional[bool] = False
+    wait: Optional[bool] = False
 
 @app.get("/", response_class=HTMLResponse)
 def ui_index():
@@ -312,23 +378,369 @@ def ui_index():
         raise HTTPException(status_code=404, detail="UI is not enabled.")
     return UI_HTML.replace('%s', json.dumps(VOICES))
 
+def _run_job(job, pcm):
+    if not _PROFILE_PATH:
+        _run_tts_counted(job.params, pcm, job.cancel)
+        return
+    with _PROFILE_LOCK:
+        trace.start()
+        try:
+            _run_tts_counted(job.params, pcm, job.cancel)
+        finally:
+            _save_trace(job.id)
+
+def _run_tts_counted(params, pcm, cancel=None):
+    try:
+        _run_tts(params, pcm, cancel)
+    except Exception as e:
+        metrics.ERRORS.inc(type(e).__name__)
+        raise
+
+def _save_trace(job_id: str):
+    recorder = trace.stop()
+    root, ext = os.path.splitext(_PROFILE_PATH)
+    path = f"{root}-{job_id}{ext or '.json'}"
+    try:
+        recorder.save(path)
+        print(f"Trace written to {path}")
+    except OSError as e:
+        print(f"Warning: Could not write trace '{path}': {e}", file=sys.stderr)
+
+def _backend_for(params):
+    return _GLOBAL_BACKENDS[params["backend"]] if params["backend"] else _GLOBAL_BACKEND
+
+def _run_tts(params, pcm, cancel=None):
+    _execute_tts_on_robots(
+        _ROBOT_POOL.resolve(params["robot"]),
+        _backend_for(params),
+        params["text"],
+        params["voice"],
+        params["model"],
+        params["speaker"],
+        params["volume"],
+        params["stream"],
+        _GLOBAL_CACHE,
+        pcm,
+        params["segmented"],
+        _GLOBAL_AUDIO,
+        params["fast"],
+        _IDLE_RETURN_S,
+        _CONTROL_HZ,
+        cancel,
+        segment_source=params.get("segment_source"),
+        on_start=params.get("on_start"),
+        audio=params.get("audio"),
+        sr=params.get("sr", OPENAI_SR)
+    )
+
+def _prefetch_job(job):
+    params = job.params
+    if params.get("segment_source") is not None or params.get("audio") is not None:
+        return None  # Text still arriving, or nothing to synthesize at all
+    if params["stream"] or params["segmented"]:
+        return None  # These synthesize as they play, sentence by sentence when segmented; a whole-text prefetch would only hold them up
+    return _prefetch_pcm(_backend_for(params), params["text"], params["voice"], params["model"], _GLOBAL_CACHE, job.cancel)
+
+def _get_job_queue() -> JobQueue:
+    global _JOB_QUEUE
+    if _JOB_QUEUE is None:
+        _JOB_QUEUE = JobQueue(_run_job, _prefetch_job, max_depth=_MAX_QUEUE_DEPTH)
+    return _JOB_QUEUE
+
+def _submit_job(opts: TTSOptions, text: str, **extra) -> TTSJob:
+    """Validates the options and queues a job, raising the HTTP error to answer otherwise."""
+    if not _ROBOT_POOL or not _ROBOT_POOL.robots or not _GLOBAL_BACKEND:
+        raise HTTPException(status_code=503, detail="TTS service is not fully initialized.")
+    if opts.backend and opts.backend not in _GLOBAL_BACKENDS:
+        raise HTTPException(status_code=422, detail=f"Unknown backend '{opts.backend}'. Available: {', '.join(sorted(_GLOBAL_BACKENDS))}.")
+    try:
+        robots = _ROBOT_POOL.resolve(opts.robot)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    params = {
+        "text": text,
+        "voice": opts.voice,
+        "model": opts.model,
+        "speaker": opts.speaker,  # None: each robot's own speaker
+        "volume": opts.volume,
+        "stream": False,
+        "segmented": False,
+        "fast": _FAST_MODE if opts.fast is None else opts.fast,
+        "backend": opts.backend,
+        "robot": opts.robot,
+        **extra,
+    }
+    try:
+        return _get_job_queue().submit(params, opts.priority or "normal", resources=tuple(r.name for r in robots))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _finished(job: TTSJob):
+    """Answer to a request that waited for its job."""
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == "cancelled":
+        return {"status": "cancelled", "message": "TTS was stopped before the end.", "job_id": job.id}
+    return {"status": "success", "message": "TTS completed.", "job_id": job.id}
+
 @app.post("/tts")
 def tts_endpoint(req: TTSRequest):
-    if not _GLOBAL_REACHY or not _GLOBAL_OPENAI:
-        raise HTTPException(status_code=503, detail="TTS service is not fully initialized.")
-        
-    with _TTS_LOCK:
+    job = _submit_job(req, req.text, stream=bool(req.stream), segmented=bool(req.segmented))
+    jobs = _get_job_queue()
+
+    if req.wait:
+        job.done.wait()
+        return _finished(job)
+
+    return JSONResponse(status_code=202, content={"status": "queued", "job_id": job.id, "position": jobs.position(job)})
+
+@app.post("/play")
+async def play_endpoint(request: Request, rate: int = DEFAULT_RAW_SR, channels: int = 1, robot: Optional[str] = None, speaker: Optional[str] = None, volume: Optional[int] = None, fast: Optional[bool] = None, priority: str = "normal", wait: bool = False):
+    """Speaks an uploaded WAV, or raw 16-bit PCM at `rate` with `channels`, with the same head sway as TTS.
+
+    Playback and motion start while the body is still uploading; only PLAY_BUFFER_CHUNKS decoded
+    chunks are held in memory, so the upload is read at the pace it is played.
+    """
+    loop = asyncio.get_running_loop()
+    decoder = AudioDecoder(rate, channels)
+    body = request.stream()
+    head = []
+    try:
+        async for data in body:
+            pcm = decoder.feed(data)
+            if pcm:
+                head.append(pcm)
+            if decoder.ready:
+                break
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not decoder.ready:
+        raise HTTPException(status_code=422, detail="Audio ended before its format could be read.")
+
+    pending: queue.Queue = queue.Queue(maxsize=PLAY_BUFFER_CHUNKS)
+
+    def _source() -> Iterator[bytes]:
+        yield from head
+        while True:
+            pcm = pending.get()
+            if pcm is None:
+                return
+            yield pcm
+
+    opts = TTSOptions(robot=robot, speaker=speaker, volume=volume, fast=fast, priority=priority)
+    job = _submit_job(opts, "(uploaded audio)", audio=_source(), sr=decoder.sr)
+
+    def _offer(pcm) -> bool:
+        # Blocks while playback is behind, and gives up once the job has ended (e.g. cancelled)
+        while not job.done.is_set():
+            try:
+                pending.put(pcm, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        async for data in body:
+            pcm = decoder.feed(data)
+            if not pcm:
+                continue
+            try:
+                pending.put_nowait(pcm)
+            except queue.Full:
+                if not await loop.run_in_executor(None, _offer, pcm):
+                    break
+    except ClientDisconnect:
+        pass  # Play what arrived
+    finally:
+        await loop.run_in_executor(None, _offer, None)
+
+    if wait:
+        await loop.run_in_executor(None, job.done.wait)
+        return _finished(job)
+    return JSONResponse(status_code=202, content={"status": job.status, "job_id": job.id})
+
+class _TextStream:
+    """One utterance of `/tts/stream`: text fragments in, complete segments out to the job speaking them."""
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.job: Optional[TTSJob] = None
+        self.started = time.perf_counter()
+        self._splitter = SegmentStream()
+        self._segments: queue.Queue = queue.Queue()
+        self._count = 0
+
+    def start(self, opts: TTSOptions) -> TTSJob:
+        self.job = _submit_job(opts, "", segment_source=self._source(), on_start=self._on_start)
+        # However the job ends, the speak path must not wait for text that will never come
+        self.job.cancel.add_callback(lambda: self._segments.put(None))
+        return self.job
+
+    def _source(self) -> Iterator[str]:
+        while True:
+            segment = self._segments.get()
+            if segment is None:
+                return
+            yield segment
+
+    def _on_start(self):
+        self.emit("first_audio", job_id=self.job.id, ms=(time.perf_counter() - self.started) * 1000.0)
+
+    def _queue(self, segments):
+        for segment in segments:
+            self._segments.put(segment)
+            self.emit("segment", job_id=self.job.id, index=self._count, text=segment)
+            self._count += 1
+
+    def feed(self, fragment: str):
+        self.job.params["text"] += fragment
+        self._queue(self._splitter.feed(fragment))
+
+    def end(self):
+        self._queue(self._splitter.flush())
+        self._segments.put(None)
+
+@app.websocket("/tts/stream")
+async def tts_stream_endpoint(ws: WebSocket):
+    """Speaks text while it is still being written, e.g. by an LLM, starting with its first complete sentence.
+
+    Messages are JSON: `{"text": "..."}` appends a fragment (the first one of an utterance may also
+    carry the `/tts` options), `{"end": true}` completes the utterance and `{"stop": true}` cuts off
+    everything this connection has queued. Plain-text messages are fragments. Each utterance is one
+    job; events `queued`, `segment`, `first_audio` and `done` (or `error`) are pushed back as JSON.
+    """
+    await ws.accept()
+    loop = asyncio.get_running_loop()
+    outbox: asyncio.Queue = asyncio.Queue()
+
+    def _emit(event: str, **info):
+        # Called from the speaking threads as well as from this handler
+        try:
+            loop.call_soon_threadsafe(outbox.put_nowait, {"event": event, **info})
+        except RuntimeError:
+            pass  # The connection's event loop is gone
+
+    async def _send_events():
+        while True:
+            await ws.send_json(await outbox.get())
+
+    async def _report(turn: _TextStream):
+        job = turn.job
+        await loop.run_in_executor(None, job.done.wait)
+        _emit("done", job_id=job.id, status=job.status, error=job.error, ms=(time.perf_counter() - turn.started) * 1000.0)
+
+    sender = asyncio.create_task(_send_events())
+    reports = []
+    jobs = []
+    turn: Optional[_TextStream] = None
+    try:
+        while True:
+            raw = await ws.receive_text()
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                msg = None
+            if not isinstance(msg, dict):
+                msg = {"text": raw}
+
+            if msg.get("stop"):
+                for job in jobs:
+                    _get_job_queue().cancel(job.id)
+                turn = None
+                continue
+
+            if turn is None:
+                turn = _TextStream(_emit)
+                try:
+                    job = turn.start(TTSOptions(**msg))
+                except HTTPException as e:
+                    _emit("error", status=e.status_code, detail=e.detail)
+                    turn = None
+                    continue
+                except ValueError as e:
+                    _emit("error", status=422, detail=str(e))
+                    turn = None
+                    continue
+                jobs = [j for j in jobs if not j.done.is_set()] + [job]
+                _emit("queued", job_id=job.id, position=_get_job_queue().position(job))
+                reports.append(asyncio.create_task(_report(turn)))
+
+            if msg.get("text"):
+                turn.feed(str(msg["text"]))
+            if msg.get("end"):
+                turn.end()
+                turn = None
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if turn is not None:
+            # The client went away mid-utterance: drop what it never finished
+            _get_job_queue().cancel(turn.job.id)
+        sender.cancel()
+        for task in reports:
+            task.cancel()
+
+@app.delete("/tts/current")
+@app.post("/stop")
+def stop_endpoint(robot: Optional[str] = None):
+    """Barge-in: stops what is being spoken now (on `robot` only, when given); queued jobs still run."""
+    resources = None
+    if robot:
+        if _ROBOT_POOL is None:
+            raise HTTPException(status_code=503, detail="TTS service is not fully initialized.")
         try:
-            target_speaker = req.speaker if req.speaker else _GLOBAL_SPEAKER
-            _execute_tts_movement(
-                _GLOBAL_REACHY, 
-                _GLOBAL_OPENAI, 
-                req.text, 
-                req.voice, 
-                req.model, 
-                target_speaker,
-                req.volume
-            )
-            return {"status": "success", "message": "TTS completed."}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            resources = [r.name for r in _ROBOT_POOL.resolve(robot)]
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    stopped = _get_job_queue().cancel_running(resources)
+    return {"status": "stopped" if stopped else "idle", "job_ids": [j.id for j in stopped]}
+
+@app.delete("/tts/{job_id}")
+def tts_job_cancel(job_id: str):
+    job = _get_job_queue().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job.to_dict()
+
+@app.get("/tts/{job_id}")
+def tts_job_status(job_id: str, wait: bool = False):
+    jobs = _get_job_queue()
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    if wait:
+        job.done.wait()
+    return {**job.to_dict(), "position": jobs.position(job)}
+
+@app.get("/queue")
+def queue_status():
+    return _get_job_queue().snapshot()
+
+@app.get("/robots")
+def robots_status():
+    if _ROBOT_POOL is None:
+        raise HTTPException(status_code=503, detail="TTS service is not fully initialized.")
+    return _ROBOT_POOL.to_dict()
+
+@app.get("/cache")
+def cache_stats():
+    if _GLOBAL_CACHE is None:
+        raise HTTPException(status_code=404, detail="Audio cache is disabled.")
+    return _GLOBAL_CACHE.stats()
+
+@app.get("/backends")
+def backend_stats():
+    return {name: backend.stats() for name, backend in _GLOBAL_BACKENDS.items()}
+
+QUEUE_DEPTH = metrics.Gauge(
+    "reachy_tts_queue_depth", "TTS jobs waiting to be spoken.",
+    fn=lambda: _JOB_QUEUE.snapshot()["depth"] if _JOB_QUEUE is not None else 0
+)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
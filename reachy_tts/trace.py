@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Active recorder, if any. Every helper below is a cheap no-op while this is None.
+_recorder: Optional["TraceRecorder"] = None
+
+class TraceRecorder:
+    """Collects spans and instants from all threads and writes them in the Chrome/Perfetto trace format."""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _event(self, name: str, ph: str, start: float, args: Dict[str, Any]) -> Dict[str, Any]:
+        thread = threading.current_thread()
+        event = {"name": name, "ph": ph, "ts": (start - self._origin) * 1e6, "pid": self._pid, "tid": thread.ident}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+        return event
+
+    def complete(self, name: str, start: float, end: float, args: Dict[str, Any]):
+        self._event(name, "X", start, args)["dur"] = (end - start) * 1e6
+
+    def instant(self, name: str, args: Dict[str, Any]):
+        self._event(name, "i", time.perf_counter(), args)["s"] = "t"
+
+    def save(self, path: str):
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f)
+
+def start() -> TraceRecorder:
+    """Starts recording into a fresh recorder and returns it."""
+    global _recorder
+    _recorder = TraceRecorder()
+    return _recorder
+
+def stop() -> Optional[TraceRecorder]:
+    """Stops recording and returns the recorder that was active."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+@contextmanager
+def span(name: str, **args):
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.complete(name, started, time.perf_counter(), args)
+
+def complete(name: str, started: float, **args):
+    """Records a span that began at `started` (a `time.perf_counter()` value) and ends now."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.complete(name, started, time.perf_counter(), args)
+
+def instant(name: str, **args):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.instant(name, args)
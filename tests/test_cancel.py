@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pyaudio")
+pytest.importorskip("reachy_mini")
+
+from benchmarks.fakes import FakeReachy, NullAudioEngine
+from reachy_tts import core
+from reachy_tts.backends import HedgedBackend, Synthesis, TTSBackend
+from reachy_tts.cancel import CancelToken
+
+FIRST_BYTE_S = 4.0
+CANCEL_AT_S = 0.3
+
+class StalledBackend(TTSBackend):
+    """Sends nothing for FIRST_BYTE_S, like a remote backend stuck before its first byte; abortable like one."""
+
+    name = "stalled"
+
+    def __init__(self):
+        self.aborted = threading.Event()
+
+    def open(self, text, voice, model, chunk_size=4096):
+        def _chunks():
+            if self.aborted.wait(FIRST_BYTE_S):
+                raise ConnectionAbortedError("aborted")
+            yield bytes(chunk_size)
+
+        return Synthesis(self.name, _chunks(), self.aborted.set)
+
+@pytest.mark.parametrize("hedged", [False, True])
+@pytest.mark.parametrize("stream", [False, True])
+def test_cancel_during_stalled_first_byte(stream, hedged):
+    stalled = StalledBackend()
+    backend = HedgedBackend(stalled, percentile=None, deadline_s=None) if hedged else stalled
+    cancel = CancelToken()
+    threading.Timer(CANCEL_AT_S, cancel.cancel).start()
+
+    start = time.monotonic()
+    stats = core._execute_tts_movement(
+        FakeReachy(goto_scale=0.0), backend, "Hello there.", "alloy", "tts-1", None,
+        stream=stream, engine=NullAudioEngine(), fast=True, cancel=cancel
+    )
+    elapsed = time.monotonic() - start
+
+    assert stats["cancelled"]
+    assert elapsed < CANCEL_AT_S + 1.0
+    assert stalled.aborted.wait(1.0)  # The request itself was cut off, not just left behind
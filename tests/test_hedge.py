@@ -0,0 +1,41 @@
+import httpx
+import pytest
+
+from reachy_tts.backends import HedgedBackend, Synthesis, TTSBackend
+
+class FlakyBackend(TTSBackend):
+    """Fails its first request with `error`, then answers."""
+
+    name = "flaky"
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.requests = 0
+
+    def open(self, text, voice, model, chunk_size=4096):
+        self.requests += 1
+        fail = self.requests == 1
+
+        def _chunks():
+            if fail:
+                raise self.error
+            yield b"\0\0" * 100
+
+        return Synthesis(self.name, _chunks())
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://tts.invalid/v1/audio/speech")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, request=request))
+
+@pytest.mark.parametrize("error", [_status_error(503), _status_error(429), httpx.ConnectError("refused"), TimeoutError("slow")])
+def test_transient_failure_is_retried(error):
+    inner = FlakyBackend(error)
+    audio = b"".join(HedgedBackend(inner, 95.0, 5.0).open("hi", "alloy", "tts-1").chunks)
+    assert audio and inner.requests == 2
+
+@pytest.mark.parametrize("error", [_status_error(400), _status_error(401), _status_error(403), ValueError("unknown voice")])
+def test_rejected_request_fails_at_once(error):
+    inner = FlakyBackend(error)
+    with pytest.raises(type(error)):
+        b"".join(HedgedBackend(inner, 95.0, 5.0).open("hi", "alloy", "tts-1").chunks)
+    assert inner.requests == 1
@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyaudio")
+pytest.importorskip("reachy_mini")
+
+from benchmarks.fakes import FakeReachy, NullAudioEngine
+from reachy_tts import core
+from reachy_tts.backends import TTSBackend
+
+class UnusedBackend(TTSBackend):
+    name = "unused"
+
+    def open(self, text, voice, model, chunk_size=4096):
+        raise AssertionError("audio is given, nothing should be synthesized")
+
+class TimedReachy(FakeReachy):
+    """Also records when each `goto_target` move ends."""
+
+    def __init__(self):
+        super().__init__(goto_scale=0.5)
+        self.goto_ends = []
+
+    def goto_target(self, head=None, antennas=None, duration: float = 0.5, body_yaw=None):
+        super().goto_target(head, antennas, duration, body_yaw)
+        self.goto_ends.append(time.monotonic())
+
+def test_next_utterance_waits_for_deferred_neutral_return():
+    reachy = TimedReachy()
+    pcm = (np.sin(np.arange(12000) * 0.05) * 8000).astype(np.int16).tobytes()
+    core._defer_neutral_return(reachy, None, 0.05)
+    time.sleep(0.15)  # The return is now moving the head
+
+    core._execute_tts_movement(
+        reachy, UnusedBackend(), "Hello there.", "alloy", "tts-1", None, pcm=pcm,
+        engine=NullAudioEngine(), fast=True, idle_return_s=60.0
+    )
+    core._cancel_neutral_return(reachy)
+
+    assert len(reachy.goto_ends) == 1
+    assert reachy.set_target_times
+    assert min(reachy.set_target_times) >= reachy.goto_ends[0]
@@ -0,0 +1,34 @@
+import threading
+import time
+
+from reachy_tts.jobs import JobQueue
+
+SLOW_PREFETCH_S = 3.0
+
+def test_job_does_not_wait_for_a_prefetch_queued_behind_another():
+    release = threading.Event()
+    started = {}
+
+    def _run(job, pcm):
+        started[job.params["text"]] = (time.monotonic(), pcm)
+        if job.params["text"] == "first":
+            release.wait(5.0)
+
+    def _prefetch(job):
+        if job.params["text"] == "second":
+            time.sleep(SLOW_PREFETCH_S)
+        return b"pcm"
+
+    queue = JobQueue(_run, _prefetch)
+    queue.submit({"text": "first"}, resources=("a",))
+    while "first" not in started:
+        time.sleep(0.01)
+    queue.submit({"text": "second"}, resources=("a",))  # Waits for "a"; its slow prefetch starts now
+    submitted = time.monotonic()
+    urgent = queue.submit({"text": "urgent"}, "urgent", resources=("b",))  # Prefetch queued behind "second"'s
+    assert urgent.done.wait(2.0)
+    release.set()
+
+    at, pcm = started["urgent"]
+    assert at - submitted < 1.0
+    assert pcm is None  # Synthesized live instead
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from reachy_tts.kinematics import HOP_MS, POSE_KEYS, PolyphaseResampler, SwayRollRT, sway_trajectory
+
+def _speech_like(sr: int, seconds: float = 6.0, seed: int = 0) -> np.ndarray:
+    """Noise bursts with pauses and a moving level, so the VAD switches on and off."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * seconds)) / sr
+    env = (np.sin(2 * np.pi * 0.4 * t) > -0.3) * (0.3 + 0.7 * np.abs(np.sin(2 * np.pi * 1.3 * t)))
+    return (rng.standard_normal(t.size) * 0.25 * env * 32767).clip(-32768, 32767).astype(np.int16)
+
+@pytest.mark.parametrize("sr", [16000, 24000, 44100])
+def test_sway_trajectory_matches_per_hop_streaming(sr):
+    pcm = _speech_like(sr)
+    hop = int(sr * HOP_MS / 1000)
+    sway = SwayRollRT()
+    rows = []
+    for i in range(0, pcm.size, hop):
+        n = sway.process(pcm[i : i + hop], sr)
+        rows.extend(sway.poses[:n].copy())
+    streamed = np.array(rows)
+
+    batch = sway_trajectory(pcm, sr)
+    assert streamed.shape == (batch["pitch_rad"].size, len(POSE_KEYS))
+    for j, key in enumerate(POSE_KEYS):
+        np.testing.assert_allclose(streamed[:, j], batch[key], rtol=0, atol=1e-9, err_msg=key)
+
+@pytest.mark.parametrize("sr_in,sr_out", [(24000, 16000), (44100, 16000), (22050, 16000)])
+def test_polyphase_resampler_is_chunk_invariant(sr_in, sr_out):
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal(sr_in * 2).astype(np.float32)
+    whole = PolyphaseResampler(sr_in, sr_out).process(x).copy()
+
+    resampler = PolyphaseResampler(sr_in, sr_out)
+    parts = []
+    pos = 0
+    for size in rng.integers(1, 3000, size=x.size):
+        parts.append(resampler.process(x[pos : pos + size]).copy())
+        pos += size
+        if pos >= x.size:
+            break
+    chunked = np.concatenate(parts)
+
+    up, down = resampler.up, resampler.down
+    assert chunked.size == whole.size == (x.size * up - 1) // down + 1
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-6)